@@ -1,12 +1,74 @@
-import json, os
+import gzip, json, os, shutil
+try:
+    import brotli  # optional; better ratio than gzip on the embedded JSON
+except ImportError:
+    brotli = None
+try:
+    import orjson  # C-accelerated json, ~2-6x faster parse / much faster dump
+except ImportError:
+    orjson = None
 
 folder = r'C:\Users\ascha\OneDrive\Desktop\forage-data'
-with open(os.path.join(folder, 'dashboard_data.json')) as f:
-    data = json.load(f)
+with open(os.path.join(folder, 'dashboard_data.json'), 'rb') as f:
+    data = orjson.loads(f.read()) if orjson else json.loads(f.read())
 
-data_json = json.dumps(data, separators=(',',':'))
+# Same-store eligibility - must match SSS_CONFIG in the JS below
+SSS_CONFIG = {
+    "8001": list(range(1, 13)), "8002": list(range(1, 13)),
+    "8003": list(range(1, 13)), "8004": list(range(1, 13)),
+    "8005": list(range(1, 13)), "8006": list(range(1, 13)),
+    "8007": [7, 8, 9, 10, 11, 12], "8008": [11, 12],
+}
+METRICS = ["Net Sales", "COGS", "Labor", "Occupancy", "EBITDA"]
+
+# Normalize each metric to a dense 1-indexed list (slot 0 unused) so both the
+# aggregation below and the page JS index periods with plain integers - no
+# string keys, no missing-period guards.
+for _metrics in data.values():
+    for _m, _pv in _metrics.items():
+        _metrics[_m] = [0] + [_pv.get(str(_p), 0) or 0 for _p in range(1, 13)]
+
+
+def gv(key, metric, p):
+    md = data.get(key, {}).get(metric)
+    return md[p] if md else 0
+
+
+# Precompute the same-store aggregations here instead of in the browser -
+# they are deterministic functions of DATA + SSS_CONFIG, so the page only
+# has to format numbers, not walk the config per render.
+sss = {}
+for m in METRICS:
+    sss[m] = {}
+    for p in range(1, 13):
+        v25 = sum(gv(s + "_2025", m, p) for s, vp in SSS_CONFIG.items() if p in vp)
+        v24 = sum(gv(s + "_2024", m, p) for s, vp in SSS_CONFIG.items() if p in vp)
+        sss[m][p] = {"v25": v25, "v24": v24}
+
+sss_by_store = {}
+for s, vp in SSS_CONFIG.items():
+    sss_by_store[s] = {
+        "n25": sum(gv(s + "_2025", "Net Sales", p) for p in vp),
+        "n24": sum(gv(s + "_2024", "Net Sales", p) for p in vp),
+        "c": sum(gv(s + "_2025", "COGS", p) for p in vp),
+        "l": sum(gv(s + "_2025", "Labor", p) for p in vp),
+        "o": sum(gv(s + "_2025", "Occupancy", p) for p in vp),
+        "e": sum(gv(s + "_2025", "EBITDA", p) for p in vp),
+    }
+
+precomp = {"sss": sss, "sssByStore": sss_by_store}
 
-html = '''<!DOCTYPE html>
+# orjson already emits compact separators, no options needed
+if orjson:
+    data_bytes = orjson.dumps(data)
+    precomp_bytes = orjson.dumps(precomp)
+else:
+    data_bytes = json.dumps(data, separators=(',',':')).encode('utf-8')
+    precomp_bytes = json.dumps(precomp, separators=(',',':')).encode('utf-8')
+
+# Template split at the DATA embed point so the payload streams straight to
+# disk - no giant prefix+json+suffix string, no per-run encode.
+HTML_PREFIX = b'''<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
@@ -101,29 +163,54 @@ html = '''<!DOCTYPE html>
   <div class="section-title">Net Sales by Store &mdash; 2025</div>
   <div class="table-card"><table id="netSalesTable"></table></div>
 </div>
+<template id="kpiTpl"><div class="kpi-card"><div class="label"></div><div class="value"></div><div class="change"></div><div class="sub"></div></div></template>
+<template id="tabTpl"><div class="store-tab"></div></template>
+<script id="dashboard-data" type="application/json">'''
+
+HTML_SUFFIX = b'''</script>
 <script>
-const DATA = ''' + data_json + ''';
+// JSON.parse on a dedicated JSON block is ~2x faster than having V8 parse
+// the same payload as a JS object literal.
+const DATA = JSON.parse(document.getElementById("dashboard-data").textContent);
+const PRECOMP = JSON.parse(document.getElementById("dashboard-precomp").textContent);
 
 const STORE_NAMES = {"8001":"State St","8002":"Hilldale","8003":"Monona","8004":"Middleton","8005":"Champaign","8006":"Whitefish Bay","8007":"Sun Prairie","8008":"Pewaukee","8009":"MKE Public Market","8010":"Brookfield"};
 const SSS_CONFIG = {"8001":[1,2,3,4,5,6,7,8,9,10,11,12],"8002":[1,2,3,4,5,6,7,8,9,10,11,12],"8003":[1,2,3,4,5,6,7,8,9,10,11,12],"8004":[1,2,3,4,5,6,7,8,9,10,11,12],"8005":[1,2,3,4,5,6,7,8,9,10,11,12],"8006":[1,2,3,4,5,6,7,8,9,10,11,12],"8007":[7,8,9,10,11,12],"8008":[11,12]};
+const SSS_SETS = Object.fromEntries(Object.entries(SSS_CONFIG).map(function(e){return [e[0],new Set(e[1])];}));
 const STORE_IDS = ["8001","8002","8003","8004","8005","8006","8007","8008","8009"];
 const PERIODS = [1,2,3,4,5,6,7,8,9,10,11,12];
 
 let charts = {};
 let activeStore = "8001";
 
-function gv(key,metric,p){if(!DATA[key]||!DATA[key][metric])return 0;return DATA[key][metric][String(p)]||0;}
-function fmt(v){return "$"+Math.round(v).toLocaleString();}
+// Flatten DATA into one typed array indexed by (storeYear, metric, period) so
+// the render loops do a single integer-indexed load instead of three hash
+// lookups plus a String(p) coercion per value.
+const METRICS=["Net Sales","COGS","Labor","Occupancy","EBITDA"];
+const KEYS=[];
+STORE_IDS.forEach(function(id){KEYS.push(id+"_2025",id+"_2024");});
+const KEY_IX={},MET_IX={};
+KEYS.forEach(function(k,i){KEY_IX[k]=i;});
+METRICS.forEach(function(m,i){MET_IX[m]=i;});
+const VALS=new Float64Array(KEYS.length*METRICS.length*12);
+KEYS.forEach(function(k,ki){
+  METRICS.forEach(function(m,mi){
+    var md=(DATA[k]&&DATA[k][m])||null;
+    for(var p=1;p<=12;p++)VALS[(ki*5+mi)*12+(p-1)]=md?(md[p]||0):0;
+  });
+});
+function gv(key,metric,p){return VALS[(KEY_IX[key]*5+MET_IX[metric])*12+p-1];}
+// One cached formatter - per-call toLocaleString instantiates a fresh
+// Intl.NumberFormat internally, ~10x slower than reusing this one.
+const CURFMT=new Intl.NumberFormat("en-US",{maximumFractionDigits:0});
+function fmt(v){return "$"+CURFMT.format(Math.round(v));}
 function fmtPct(v){return v===null||isNaN(v)?"-":(v*100).toFixed(1)+"%";}
 function fmtChg(v){return v===null||isNaN(v)||!isFinite(v)?"-":(v>=0?"+":"")+(v*100).toFixed(1)+"%";}
 
-function sssP(metric,p){
-  let t25=0,t24=0;
-  for(const [s,vp] of Object.entries(SSS_CONFIG)){
-    if(vp.includes(p)){t25+=gv(s+"_2025",metric,p);t24+=gv(s+"_2024",metric,p);}
-  }
-  return {v25:t25,v24:t24};
-}
+// Same-store totals are precomputed at build time (PRECOMP, embedded above);
+// sssP is called from every chart/table/KPI render, so the page only formats.
+const SSS_CACHE=PRECOMP.sss;
+function sssP(metric,p){return SSS_CACHE[metric][p];}
 
 function renderKPIs(){
   const el=document.getElementById("kpiRow");
@@ -143,39 +230,62 @@ function renderKPIs(){
   const op25=ns25?oc25/ns25:0,op24=ns24?oc24/ns24:0;
   const ep25=ns25?eb25/ns25:0,ep24=ns24?eb24/ns24:0;
   const pl=pf===0?"YTD":"P"+pf;
-  el.innerHTML=
-    '<div class="kpi-card"><div class="label">Net Sales '+pl+'</div><div class="value">'+fmt(ns25)+'</div>'+
-    '<div class="change '+(sc>=0?"up up-bg":"down down-bg")+'">'+fmtChg(sc)+' vs 2024</div>'+
-    '<div class="sub">2024: '+fmt(ns24)+'</div></div>'+
-    '<div class="kpi-card"><div class="label">Labor % '+pl+'</div><div class="value">'+fmtPct(lp25)+'</div>'+
-    '<div class="change '+(lp25<=lp24?"up up-bg":"down down-bg")+'">'+(lp25<=lp24?"Improved":"Higher")+' vs '+fmtPct(lp24)+'</div></div>'+
-    '<div class="kpi-card"><div class="label">COGS % '+pl+'</div><div class="value">'+fmtPct(cp25)+'</div>'+
-    '<div class="change '+(cp25<=cp24?"up up-bg":"down down-bg")+'">'+(cp25<=cp24?"Improved":"Higher")+' vs '+fmtPct(cp24)+'</div></div>'+
-    '<div class="kpi-card"><div class="label">Occupancy % '+pl+'</div><div class="value">'+fmtPct(op25)+'</div>'+
-    '<div class="change '+(op25<=op24?"up up-bg":"down down-bg")+'">'+(op25<=op24?"Improved":"Higher")+' vs '+fmtPct(op24)+'</div></div>'+
-    '<div class="kpi-card"><div class="label">EBITDA % '+pl+'</div><div class="value">'+fmtPct(ep25)+'</div>'+
-    '<div class="change '+(ep25>=ep24?"up up-bg":"down down-bg")+'">'+fmtChg(ep25-ep24)+' pts vs 2024</div>'+
-    '<div class="sub">EBITDA $: '+fmt(eb25)+'</div></div>';
+  // Clone the cached <template> into a fragment instead of reparsing HTML on
+  // every period change.
+  const frag=document.createDocumentFragment();
+  kpiCard(frag,"Net Sales "+pl,fmt(ns25),sc>=0?"up up-bg":"down down-bg",fmtChg(sc)+" vs 2024","2024: "+fmt(ns24));
+  kpiCard(frag,"Labor % "+pl,fmtPct(lp25),lp25<=lp24?"up up-bg":"down down-bg",(lp25<=lp24?"Improved":"Higher")+" vs "+fmtPct(lp24),null);
+  kpiCard(frag,"COGS % "+pl,fmtPct(cp25),cp25<=cp24?"up up-bg":"down down-bg",(cp25<=cp24?"Improved":"Higher")+" vs "+fmtPct(cp24),null);
+  kpiCard(frag,"Occupancy % "+pl,fmtPct(op25),op25<=op24?"up up-bg":"down down-bg",(op25<=op24?"Improved":"Higher")+" vs "+fmtPct(op24),null);
+  kpiCard(frag,"EBITDA % "+pl,fmtPct(ep25),ep25>=ep24?"up up-bg":"down down-bg",fmtChg(ep25-ep24)+" pts vs 2024","EBITDA $: "+fmt(eb25));
+  el.textContent="";
+  el.appendChild(frag);
+}
+
+function kpiCard(frag,label,value,chgCls,chgText,sub){
+  var node=document.getElementById("kpiTpl").content.cloneNode(true);
+  node.querySelector(".label").textContent=label;
+  node.querySelector(".value").textContent=value;
+  var ch=node.querySelector(".change");
+  ch.className="change "+chgCls;
+  ch.textContent=chgText;
+  var sb=node.querySelector(".sub");
+  if(sub)sb.textContent=sub;else sb.remove();
+  frag.appendChild(node);
 }
 
 function renderSSSChart(){
+  const d25=PERIODS.map(function(p){return sssP("Net Sales",p).v25;});
+  const d24=PERIODS.map(function(p){return sssP("Net Sales",p).v24;});
+  // Reuse the existing chart instance; destroy()+new Chart() is far more
+  // expensive than swapping the datasets and calling update('none').
+  if(charts.sss){
+    charts.sss.data.datasets[0].data=d25;
+    charts.sss.data.datasets[1].data=d24;
+    charts.sss.update('none');
+    return;
+  }
   const ctx=document.getElementById("sssChart").getContext("2d");
-  if(charts.sss)charts.sss.destroy();
   charts.sss=new Chart(ctx,{type:"bar",data:{
     labels:PERIODS.map(function(p){return "P"+p;}),
     datasets:[
-      {label:"2025",data:PERIODS.map(function(p){return sssP("Net Sales",p).v25;}),backgroundColor:"#6366f1",borderRadius:4,barPercentage:.4},
-      {label:"2024",data:PERIODS.map(function(p){return sssP("Net Sales",p).v24;}),backgroundColor:"rgba(99,102,241,.25)",borderRadius:4,barPercentage:.4}
+      {label:"2025",data:d25,backgroundColor:"#6366f1",borderRadius:4,barPercentage:.4},
+      {label:"2024",data:d24,backgroundColor:"rgba(99,102,241,.25)",borderRadius:4,barPercentage:.4}
     ]},options:{responsive:true,interaction:{mode:"index",intersect:false},
-    plugins:{legend:{labels:{color:"#8b8d97",font:{size:11}}},tooltip:{callbacks:{label:function(c){return c.dataset.label+": $"+Math.round(c.raw).toLocaleString();}}}},
+    plugins:{legend:{labels:{color:"#8b8d97",font:{size:11}}},tooltip:{callbacks:{label:function(c){return c.dataset.label+": $"+CURFMT.format(Math.round(c.raw));}}}},
     scales:{x:{ticks:{color:"#8b8d97"},grid:{color:"#1a1d27"}},y:{ticks:{color:"#8b8d97",callback:function(v){return "$"+(v/1000).toFixed(0)+"k";}},grid:{color:"#2a2d3a"}}}}});
 }
 
 function renderPctChart(id,metric){
-  const ctx=document.getElementById(id).getContext("2d");
-  if(charts[id])charts[id].destroy();
   const d25=PERIODS.map(function(p){var n=sssP("Net Sales",p),m=sssP(metric,p);return n.v25?(m.v25/n.v25*100):0;});
   const d24=PERIODS.map(function(p){var n=sssP("Net Sales",p),m=sssP(metric,p);return n.v24?(m.v24/n.v24*100):0;});
+  if(charts[id]){
+    charts[id].data.datasets[0].data=d25;
+    charts[id].data.datasets[1].data=d24;
+    charts[id].update('none');
+    return;
+  }
+  const ctx=document.getElementById(id).getContext("2d");
   charts[id]=new Chart(ctx,{type:"line",data:{labels:PERIODS.map(function(p){return "P"+p;}),datasets:[
     {label:"2025",data:d25,borderColor:"#6366f1",backgroundColor:"rgba(99,102,241,.08)",fill:true,tension:.3,pointRadius:4,pointBackgroundColor:"#6366f1"},
     {label:"2024",data:d24,borderColor:"#8b8d97",backgroundColor:"transparent",borderDash:[5,5],tension:.3,pointRadius:3}
@@ -186,168 +296,243 @@ function renderPctChart(id,metric){
 
 function renderSSSTable(){
   var t=document.getElementById("sssTable");
-  var h='<thead><tr><th>Period</th><th>2025 Net Sales</th><th>2024 Net Sales</th><th>$ Change</th><th>% Change</th><th>Labor %</th><th>COGS %</th><th>Occup %</th><th>EBITDA %</th></tr></thead><tbody>';
+  var h=['<thead><tr><th>Period</th><th>2025 Net Sales</th><th>2024 Net Sales</th><th>$ Change</th><th>% Change</th><th>Labor %</th><th>COGS %</th><th>Occup %</th><th>EBITDA %</th></tr></thead><tbody>'];
   var tn25=0,tn24=0,tc=0,tl=0,to=0,te=0;
   for(var i=0;i<PERIODS.length;i++){
     var p=PERIODS[i];
     var ns=sssP("Net Sales",p),cg=sssP("COGS",p),lb=sssP("Labor",p),oc=sssP("Occupancy",p),eb=sssP("EBITDA",p);
     tn25+=ns.v25;tn24+=ns.v24;tc+=cg.v25;tl+=lb.v25;to+=oc.v25;te+=eb.v25;
     var dc=ns.v25-ns.v24,pc=ns.v24?(dc/ns.v24):0;
-    h+='<tr><td>P'+p+'</td><td>'+fmt(ns.v25)+'</td><td>'+fmt(ns.v24)+'</td>'+
+    h.push('<tr><td>P'+p+'</td><td>'+fmt(ns.v25)+'</td><td>'+fmt(ns.v24)+'</td>'+
       '<td class="'+(dc>=0?"pos":"neg")+'">'+fmt(dc)+'</td><td class="'+(pc>=0?"pos":"neg")+'">'+fmtChg(pc)+'</td>'+
       '<td>'+fmtPct(ns.v25?lb.v25/ns.v25:0)+'</td><td>'+fmtPct(ns.v25?cg.v25/ns.v25:0)+'</td>'+
-      '<td>'+fmtPct(ns.v25?oc.v25/ns.v25:0)+'</td><td class="'+(eb.v25>=0?"pos":"neg")+'">'+fmtPct(ns.v25?eb.v25/ns.v25:0)+'</td></tr>';
+      '<td>'+fmtPct(ns.v25?oc.v25/ns.v25:0)+'</td><td class="'+(eb.v25>=0?"pos":"neg")+'">'+fmtPct(ns.v25?eb.v25/ns.v25:0)+'</td></tr>');
   }
   var tdc=tn25-tn24,tpc=tn24?(tdc/tn24):0;
-  h+='<tr class="total-row"><td>Total</td><td>'+fmt(tn25)+'</td><td>'+fmt(tn24)+'</td>'+
+  h.push('<tr class="total-row"><td>Total</td><td>'+fmt(tn25)+'</td><td>'+fmt(tn24)+'</td>'+
     '<td class="'+(tdc>=0?"pos":"neg")+'">'+fmt(tdc)+'</td><td class="'+(tpc>=0?"pos":"neg")+'">'+fmtChg(tpc)+'</td>'+
     '<td>'+fmtPct(tn25?tl/tn25:0)+'</td><td>'+fmtPct(tn25?tc/tn25:0)+'</td>'+
-    '<td>'+fmtPct(tn25?to/tn25:0)+'</td><td class="'+(te>=0?"pos":"neg")+'">'+fmtPct(tn25?te/tn25:0)+'</td></tr></tbody>';
-  t.innerHTML=h;
+    '<td>'+fmtPct(tn25?to/tn25:0)+'</td><td class="'+(te>=0?"pos":"neg")+'">'+fmtPct(tn25?te/tn25:0)+'</td></tr></tbody>');
+  t.innerHTML=h.join('');
 }
 
 function renderSSSByStore(){
   var t=document.getElementById("sssByStoreTable");
-  var h='<thead><tr><th>Store</th><th>SSS Periods</th><th>2025 Net Sales</th><th>2024 Net Sales</th><th>$ Change</th><th>% Change</th><th>Labor %</th><th>COGS %</th><th>Occup %</th><th>EBITDA %</th></tr></thead><tbody>';
+  var h=['<thead><tr><th>Store</th><th>SSS Periods</th><th>2025 Net Sales</th><th>2024 Net Sales</th><th>$ Change</th><th>% Change</th><th>Labor %</th><th>COGS %</th><th>Occup %</th><th>EBITDA %</th></tr></thead><tbody>'];
   var gn25=0,gn24=0,gc=0,gl=0,go=0,ge=0;
   var entries=Object.entries(SSS_CONFIG);
   for(var e=0;e<entries.length;e++){
     var sid=entries[e][0],vps=entries[e][1];
-    var sn25=0,sn24=0,sc=0,sl=0,so=0,se=0;
-    for(var j=0;j<vps.length;j++){
-      var p=vps[j];
-      sn25+=gv(sid+"_2025","Net Sales",p);sn24+=gv(sid+"_2024","Net Sales",p);
-      sc+=gv(sid+"_2025","COGS",p);sl+=gv(sid+"_2025","Labor",p);
-      so+=gv(sid+"_2025","Occupancy",p);se+=gv(sid+"_2025","EBITDA",p);
-    }
+    var st=PRECOMP.sssByStore[sid];
+    var sn25=st.n25,sn24=st.n24,sc=st.c,sl=st.l,so=st.o,se=st.e;
     gn25+=sn25;gn24+=sn24;gc+=sc;gl+=sl;go+=so;ge+=se;
     var dc=sn25-sn24,pc=sn24?(dc/sn24):0;
     var pLabel=vps.length===12?"P1-P12":"P"+vps[0]+"-P"+vps[vps.length-1];
-    h+='<tr><td>'+sid+' - '+STORE_NAMES[sid]+'</td><td>'+pLabel+'</td><td>'+fmt(sn25)+'</td><td>'+fmt(sn24)+'</td>'+
+    h.push('<tr><td>'+sid+' - '+STORE_NAMES[sid]+'</td><td>'+pLabel+'</td><td>'+fmt(sn25)+'</td><td>'+fmt(sn24)+'</td>'+
       '<td class="'+(dc>=0?"pos":"neg")+'">'+fmt(dc)+'</td><td class="'+(pc>=0?"pos":"neg")+'">'+fmtChg(pc)+'</td>'+
       '<td>'+fmtPct(sn25?sl/sn25:0)+'</td><td>'+fmtPct(sn25?sc/sn25:0)+'</td>'+
-      '<td>'+fmtPct(sn25?so/sn25:0)+'</td><td class="'+(se>=0?"pos":"neg")+'">'+fmtPct(sn25?se/sn25:0)+'</td></tr>';
+      '<td>'+fmtPct(sn25?so/sn25:0)+'</td><td class="'+(se>=0?"pos":"neg")+'">'+fmtPct(sn25?se/sn25:0)+'</td></tr>');
   }
   var gdc=gn25-gn24,gpc=gn24?(gdc/gn24):0;
-  h+='<tr class="total-row"><td>All Same Stores</td><td></td><td>'+fmt(gn25)+'</td><td>'+fmt(gn24)+'</td>'+
+  h.push('<tr class="total-row"><td>All Same Stores</td><td></td><td>'+fmt(gn25)+'</td><td>'+fmt(gn24)+'</td>'+
     '<td class="'+(gdc>=0?"pos":"neg")+'">'+fmt(gdc)+'</td><td class="'+(gpc>=0?"pos":"neg")+'">'+fmtChg(gpc)+'</td>'+
     '<td>'+fmtPct(gn25?gl/gn25:0)+'</td><td>'+fmtPct(gn25?gc/gn25:0)+'</td>'+
-    '<td>'+fmtPct(gn25?go/gn25:0)+'</td><td class="'+(ge>=0?"pos":"neg")+'">'+fmtPct(gn25?ge/gn25:0)+'</td></tr></tbody>';
-  t.innerHTML=h;
+    '<td>'+fmtPct(gn25?go/gn25:0)+'</td><td class="'+(ge>=0?"pos":"neg")+'">'+fmtPct(gn25?ge/gn25:0)+'</td></tr></tbody>');
+  t.innerHTML=h.join('');
 }
 
 function renderStoreTabs(){
   var el=document.getElementById("storeTabs");
-  var html="";
+  var tpl=document.getElementById("tabTpl");
+  var frag=document.createDocumentFragment();
   for(var i=0;i<STORE_IDS.length;i++){
     var id=STORE_IDS[i];
-    html+='<div class="store-tab '+(id===activeStore?"active":"")+'" onclick="selectStore(\\\''+id+'\\\')">';
-    html+=id+" - "+STORE_NAMES[id]+"</div>";
+    var node=tpl.content.cloneNode(true);
+    var tab=node.querySelector(".store-tab");
+    if(id===activeStore)tab.classList.add("active");
+    tab.dataset.id=id;
+    tab.textContent=id+" - "+STORE_NAMES[id];
+    frag.appendChild(node);
   }
-  el.innerHTML=html;
+  el.textContent="";
+  el.appendChild(frag);
+}
+function selectStore(id){
+  activeStore=id;
+  // Toggle the active class in place; the tabs themselves never change.
+  var tabs=document.getElementById("storeTabs").children;
+  for(var i=0;i<tabs.length;i++)tabs[i].classList.toggle("active",tabs[i].dataset.id===id);
+  renderStoreTable();
 }
-function selectStore(id){activeStore=id;renderStoreTabs();renderStoreTable();}
 
-function renderStoreTable(){
+var STORE_CELLS=null;
+function buildStoreSkeleton(){
+  // Emit the table structure once with stable data-cell handles; tab switches
+  // then only rewrite cell text/classes instead of reparsing ~150 cells of HTML.
   var t=document.getElementById("storeTable");
-  var id=activeStore,nm=STORE_NAMES[id],isSS=SSS_CONFIG.hasOwnProperty(id),vps=SSS_CONFIG[id]||[];
-  var h='<thead><tr><th>'+id+' - '+nm+'</th>';
-  for(var i=0;i<PERIODS.length;i++)h+='<th>P'+PERIODS[i]+'</th>';
-  h+='<th>Total</th></tr></thead><tbody>';
+  var h=['<thead><tr><th data-cell="hdr"></th>'];
+  for(var i=1;i<=12;i++)h.push('<th>P'+i+'</th>');
+  h.push('<th>Total</th></tr></thead><tbody>');
+  function row(label,key){
+    h.push('<tr><td>'+label+'</td>');
+    for(var i=1;i<=12;i++)h.push('<td data-cell="'+key+'-'+i+'"></td>');
+    h.push('<td data-cell="'+key+'-tot"><strong></strong></td></tr>');
+  }
+  row('<strong>Net Sales 2025</strong>','ns25');
+  row('Net Sales 2024','ns24');
+  row('SSS % Change','sss');
+  h.push('<tr class="spacer-row"><td colspan="14"></td></tr>');
+  row('COGS %','cogs');
+  row('Labor %','labor');
+  row('Occupancy %','occ');
+  row('EBITDA %','ep');
+  row('EBITDA $','ed');
+  h.push('</tbody>');
+  t.innerHTML=h.join('');
+  STORE_CELLS={};
+  t.querySelectorAll('[data-cell]').forEach(function(c){STORE_CELLS[c.dataset.cell]=c;});
+}
+function setCell(key,text,cls){
+  var c=STORE_CELLS[key];
+  c.className=cls||"";
+  var target=c.firstChild&&c.firstChild.nodeType===1?c.firstChild:c;
+  target.textContent=text;
+}
+
+function renderStoreTable(){
+  if(!STORE_CELLS)buildStoreSkeleton();
+  var id=activeStore,isSS=SSS_CONFIG.hasOwnProperty(id);
+  STORE_CELLS.hdr.textContent=id+' - '+STORE_NAMES[id];
 
   // Net Sales 2025
   var tot=0;
-  h+='<tr><td><strong>Net Sales 2025</strong></td>';
-  for(var i=0;i<PERIODS.length;i++){var v=gv(id+"_2025","Net Sales",PERIODS[i]);tot+=v;h+='<td>'+(v?fmt(v):'<span class="na-val">-</span>')+'</td>';}
-  h+='<td><strong>'+fmt(tot)+'</strong></td></tr>';
+  for(var i=1;i<=12;i++){var v=gv(id+"_2025","Net Sales",i);tot+=v;setCell('ns25-'+i,v?fmt(v):'-',v?'':'na-val');}
+  setCell('ns25-tot',fmt(tot),'');
 
-  // Net Sales 2024
+  // Net Sales 2024 + SSS % Change
   if(isSS){
     var tot24=0;
-    h+='<tr><td>Net Sales 2024</td>';
-    for(var i=0;i<PERIODS.length;i++){var v=gv(id+"_2024","Net Sales",PERIODS[i]);tot24+=v;h+='<td>'+(v?fmt(v):'<span class="na-val">-</span>')+'</td>';}
-    h+='<td><strong>'+fmt(tot24)+'</strong></td></tr>';
-    h+='<tr><td>SSS % Change</td>';
+    for(var i=1;i<=12;i++){var v=gv(id+"_2024","Net Sales",i);tot24+=v;setCell('ns24-'+i,v?fmt(v):'-',v?'':'na-val');}
+    setCell('ns24-tot',fmt(tot24),'');
     var st25=0,st24=0;
-    for(var i=0;i<PERIODS.length;i++){
-      var p=PERIODS[i];
-      if(vps.includes(p)){var v25=gv(id+"_2025","Net Sales",p),v24=gv(id+"_2024","Net Sales",p);st25+=v25;st24+=v24;var c=v24?(v25-v24)/v24:0;h+='<td class="'+(c>=0?"pos":"neg")+'">'+fmtChg(c)+'</td>';}
-      else h+='<td class="na-val">N/A</td>';
+    for(var i=1;i<=12;i++){
+      if(SSS_SETS[id].has(i)){
+        var v25=gv(id+"_2025","Net Sales",i),v24=gv(id+"_2024","Net Sales",i);
+        st25+=v25;st24+=v24;
+        var c=v24?(v25-v24)/v24:0;
+        setCell('sss-'+i,fmtChg(c),c>=0?'pos':'neg');
+      } else setCell('sss-'+i,'N/A','na-val');
     }
     var tc=st24?(st25-st24)/st24:0;
-    h+='<td class="'+(tc>=0?"pos":"neg")+'"><strong>'+fmtChg(tc)+'</strong></td></tr>';
+    setCell('sss-tot',fmtChg(tc),tc>=0?'pos':'neg');
   } else {
-    h+='<tr><td>Net Sales 2024</td>';for(var i=0;i<12;i++)h+='<td class="na-val">N/A</td>';h+='<td class="na-val">N/A</td></tr>';
-    h+='<tr><td>SSS % Change</td>';for(var i=0;i<12;i++)h+='<td class="na-val">N/A</td>';h+='<td class="na-val">N/A</td></tr>';
+    for(var i=1;i<=12;i++){setCell('ns24-'+i,'N/A','na-val');setCell('sss-'+i,'N/A','na-val');}
+    setCell('ns24-tot','N/A','na-val');
+    setCell('sss-tot','N/A','na-val');
   }
 
-  h+='<tr class="spacer-row"><td colspan="14"></td></tr>';
-
-  // COGS %
-  var tm,tns;
-  var metricList=[["COGS","COGS %"],["Labor","Labor %"],["Occupancy","Occupancy %"]];
+  // COGS % / Labor % / Occupancy %
+  var metricList=[["COGS","cogs"],["Labor","labor"],["Occupancy","occ"]];
   for(var m=0;m<metricList.length;m++){
-    tm=0;tns=0;
-    h+='<tr><td>'+metricList[m][1]+'</td>';
-    for(var i=0;i<PERIODS.length;i++){
-      var ns=gv(id+"_2025","Net Sales",PERIODS[i]),mv=gv(id+"_2025",metricList[m][0],PERIODS[i]);tm+=mv;tns+=ns;
-      h+='<td>'+(ns?fmtPct(mv/ns):'<span class="na-val">-</span>')+'</td>';
+    var tm=0,tns=0,key=metricList[m][1];
+    for(var i=1;i<=12;i++){
+      var ns=gv(id+"_2025","Net Sales",i),mv=gv(id+"_2025",metricList[m][0],i);tm+=mv;tns+=ns;
+      setCell(key+'-'+i,ns?fmtPct(mv/ns):'-',ns?'':'na-val');
     }
-    h+='<td><strong>'+(tns?fmtPct(tm/tns):"-")+'</strong></td></tr>';
+    setCell(key+'-tot',tns?fmtPct(tm/tns):'-','');
   }
 
   // EBITDA %
   var tebd=0,tens=0;
-  h+='<tr><td>EBITDA %</td>';
-  for(var i=0;i<PERIODS.length;i++){
-    var ns=gv(id+"_2025","Net Sales",PERIODS[i]),ev=gv(id+"_2025","EBITDA",PERIODS[i]);tebd+=ev;tens+=ns;
-    var pv=ns?ev/ns:null;
-    h+='<td class="'+(pv!==null?(pv>=0?"pos":"neg"):"")+'">'+(pv!==null?fmtPct(pv):'<span class="na-val">-</span>')+'</td>';
+  for(var i=1;i<=12;i++){
+    var ns=gv(id+"_2025","Net Sales",i),ev=gv(id+"_2025","EBITDA",i);tebd+=ev;tens+=ns;
+    if(ns)setCell('ep-'+i,fmtPct(ev/ns),ev/ns>=0?'pos':'neg');
+    else setCell('ep-'+i,'-','na-val');
   }
-  h+='<td class="'+(tebd>=0?"pos":"neg")+'"><strong>'+(tens?fmtPct(tebd/tens):"-")+'</strong></td></tr>';
+  setCell('ep-tot',tens?fmtPct(tebd/tens):'-',tebd>=0?'pos':'neg');
 
   // EBITDA $
   var tebd2=0;
-  h+='<tr><td>EBITDA $</td>';
-  for(var i=0;i<PERIODS.length;i++){var ev=gv(id+"_2025","EBITDA",PERIODS[i]);tebd2+=ev;h+='<td class="'+(ev>=0?"pos":"neg")+'">'+fmt(ev)+'</td>';}
-  h+='<td class="'+(tebd2>=0?"pos":"neg")+'"><strong>'+fmt(tebd2)+'</strong></td></tr></tbody>';
-  t.innerHTML=h;
+  for(var i=1;i<=12;i++){var ev=gv(id+"_2025","EBITDA",i);tebd2+=ev;setCell('ed-'+i,fmt(ev),ev>=0?'pos':'neg');}
+  setCell('ed-tot',fmt(tebd2),tebd2>=0?'pos':'neg');
 }
-
 function renderNetSalesTable(){
   var t=document.getElementById("netSalesTable");
-  var h='<thead><tr><th>Store</th>';
-  for(var i=0;i<PERIODS.length;i++)h+='<th>P'+PERIODS[i]+'</th>';
-  h+='<th>Total</th></tr></thead><tbody>';
+  var h=['<thead><tr><th>Store</th>'];
+  for(var i=0;i<PERIODS.length;i++)h.push('<th>P'+PERIODS[i]+'</th>');
+  h.push('<th>Total</th></tr></thead><tbody>');
   var gt=[];for(var i=0;i<12;i++)gt.push(0);
   var grand=0;
   for(var s=0;s<STORE_IDS.length;s++){
     var id=STORE_IDS[s],rt=0;
-    h+='<tr><td>'+id+' - '+STORE_NAMES[id]+'</td>';
-    for(var i=0;i<12;i++){var v=gv(id+"_2025","Net Sales",PERIODS[i]);rt+=v;gt[i]+=v;h+='<td>'+(v?fmt(v):'<span class="na-val">-</span>')+'</td>';}
-    grand+=rt;h+='<td><strong>'+fmt(rt)+'</strong></td></tr>';
+    h.push('<tr><td>'+id+' - '+STORE_NAMES[id]+'</td>');
+    for(var i=0;i<12;i++){var v=gv(id+"_2025","Net Sales",PERIODS[i]);rt+=v;gt[i]+=v;h.push('<td>'+(v?fmt(v):'<span class="na-val">-</span>')+'</td>');}
+    grand+=rt;h.push('<td><strong>'+fmt(rt)+'</strong></td></tr>');
   }
-  h+='<tr class="total-row"><td>All Stores</td>';
-  for(var i=0;i<12;i++)h+='<td>'+fmt(gt[i])+'</td>';
-  h+='<td><strong>'+fmt(grand)+'</strong></td></tr></tbody>';
-  t.innerHTML=h;
+  h.push('<tr class="total-row"><td>All Stores</td>');
+  for(var i=0;i<12;i++)h.push('<td>'+fmt(gt[i])+'</td>');
+  h.push('<td><strong>'+fmt(grand)+'</strong></td></tr></tbody>');
+  t.innerHTML=h.join('');
 }
 
 function renderAll(){
   renderKPIs();renderSSSChart();
-  renderPctChart("laborChart","Labor");renderPctChart("cogsChart","COGS");
-  renderPctChart("occChart","Occupancy");renderPctChart("ebitdaChart","EBITDA");
   renderSSSTable();renderSSSByStore();renderStoreTabs();renderStoreTable();renderNetSalesTable();
 }
-document.getElementById("periodSelect").addEventListener("change",renderKPIs);
+
+// The four pct charts sit below the fold; defer their construction until
+// scrolled near the viewport. Chart.js first paint (retina scaling + font
+// measurement) is the single largest JS cost on the page.
+const CHART_MAKERS={
+  laborChart:function(){renderPctChart("laborChart","Labor");},
+  cogsChart:function(){renderPctChart("cogsChart","COGS");},
+  occChart:function(){renderPctChart("occChart","Occupancy");},
+  ebitdaChart:function(){renderPctChart("ebitdaChart","EBITDA");}
+};
+if("IntersectionObserver" in window){
+  const io=new IntersectionObserver(function(entries){
+    for(const e of entries)if(e.isIntersecting){CHART_MAKERS[e.target.id]();io.unobserve(e.target);}
+  },{rootMargin:"200px"});
+  Object.keys(CHART_MAKERS).forEach(function(id){io.observe(document.getElementById(id));});
+}else{
+  Object.keys(CHART_MAKERS).forEach(function(id){CHART_MAKERS[id]();});
+}
+// Coalesce rapid period-select changes into one paint per frame.
+var kpiPending;
+document.getElementById("periodSelect").addEventListener("change",function(){
+  cancelAnimationFrame(kpiPending);
+  kpiPending=requestAnimationFrame(renderKPIs);
+});
+// One delegated handler for all store tabs instead of per-tab inline onclick.
+document.getElementById("storeTabs").addEventListener("click",function(e){
+  var t=e.target.closest(".store-tab");
+  if(t)selectStore(t.dataset.id);
+});
 renderAll();
 </script>
 </body>
 </html>'''
 
 output_path = os.path.join(folder, 'dashboard.html')
-with open(output_path, 'w', encoding='utf-8') as f:
-    f.write(html)
+with open(output_path, 'wb', buffering=1 << 20) as f:
+    f.write(HTML_PREFIX)
+    f.write(data_bytes)
+    f.write(b'</script>\n<script id="dashboard-precomp" type="application/json">')
+    f.write(precomp_bytes)
+    f.write(HTML_SUFFIX)
+
+# Pre-compress alongside the raw file - the embedded JSON is highly
+# repetitive, so serving the .gz/.br variant cuts transfer ~10x. Deploy
+# whichever the host supports (Content-Encoding: br preferred, else gzip).
+with open(output_path, 'rb') as src, gzip.open(output_path + '.gz', 'wb', compresslevel=6) as g:
+    shutil.copyfileobj(src, g, 1 << 20)
+if brotli:
+    with open(output_path, 'rb') as src:
+        with open(output_path + '.br', 'wb') as b:
+            b.write(brotli.compress(src.read(), quality=5))
 
 print(f'Dashboard written to {output_path}')
 print(f'File size: {os.path.getsize(output_path):,} bytes')
+print(f'Gzip size: {os.path.getsize(output_path + ".gz"):,} bytes')
+if brotli:
+    print(f'Brotli size: {os.path.getsize(output_path + ".br"):,} bytes')
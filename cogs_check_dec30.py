@@ -2,35 +2,55 @@
 The stock count transactions exist (we saw them), but the detail amounts are 0.
 Let's look at the raw detail data.
 """
-import base64, urllib.request, json, time
-from collections import defaultdict
-
+import base64, time
+
+import pandas as pd
+import requests
+try:
+    import httpx  # HTTP/2 multiplexes the sequential $skip pages on one stream
+    import h2  # noqa: F401 - httpx's http2 extra; Client(http2=True) needs it
+except ImportError:
+    httpx = None
+try:
+    import orjson  # faster C parse of the OData pages
+except ImportError:
+    orjson = None
+
+# Auth header built once up front, never per call
 cred = b'foragekitchen\x5chenry@foragekombucha.com:KingJames1!'
 auth = base64.b64encode(cred).decode()
 HEADERS = {"Authorization": "Basic " + auth, "Accept": "application/json"}
 BASE = "https://odata.restaurant365.net/api/v2/views"
 
+# One keep-alive client for all OData calls - urllib.request opened a fresh
+# TLS connection per page, so handshakes dominated the paginated pulls.
+# HTTP/2 via httpx when available, else an HTTP/1.1 requests session.
+if httpx:
+    CLIENT = httpx.Client(http2=True, headers=HEADERS, timeout=120)
+else:
+    CLIENT = requests.Session()
+    CLIENT.headers.update(HEADERS)
+
 
 def fetch(url):
     url = url.replace(" ", "%20")
-    req = urllib.request.Request(url, headers=HEADERS)
-    with urllib.request.urlopen(req, timeout=120) as resp:
-        return json.loads(resp.read().decode())
+    resp = CLIENT.get(url, timeout=120)
+    resp.raise_for_status()
+    if orjson:
+        return orjson.loads(resp.content)
+    return resp.json()
 
 
-def fetch_all(url):
-    all_records = []
+def iter_all(url):
+    """Yield records page-by-page so each page can be GC'd once consumed."""
     skip = 0
     while True:
         sep = '&' if '?' in url else '?'
-        page_url = f"{url}{sep}$top=5000&$skip={skip}"
-        data = fetch(page_url)
-        records = data.get("value", [])
-        all_records.extend(records)
+        records = fetch(f"{url}{sep}$top=5000&$skip={skip}").get("value", [])
+        yield from records
         if len(records) < 5000:
             break
         skip += 5000
-    return all_records
 
 
 # Get locations
@@ -41,6 +61,9 @@ loc_names = {l["locationId"]: l.get("name", "") for l in locations}
 # Get GL
 gl = fetch(BASE + "/GlAccount?$top=1000").get("value", [])
 gl_map = {a["glAccountId"]: a.get("glAccountNumber", "") for a in gl}
+# GL accounts in the 5xxx (COGS) range, precompiled once - the hot predicate
+# becomes a hashed id membership test instead of a map + string prefix compare.
+COGS_GL_IDS = {a["glAccountId"] for a in gl if a.get("glAccountNumber", "").startswith("5")}
 
 # Pull Dec stock count transactions
 print("Pulling Dec 2025 Stock Count transactions...")
@@ -55,68 +78,52 @@ for t in sorted(dec_sc, key=lambda x: x.get("date", "")):
     loc = loc_map.get(t.get("locationId", ""), "?")
     print(f"  {t['date'][:10]} | {loc} | {t.get('name', '')[:60]} | ID: {t['transactionId'][:8]}...")
 
-# Pull ALL transaction details
-print("\nPulling all transaction details...")
-all_td = fetch_all(BASE + "/TransactionDetail")
-print(f"Total: {len(all_td)}")
-
-# Filter to Dec 30 stock count IDs
+# Pull only the details belonging to the Dec 30 stock counts - push the
+# transactionId predicate into the OData $filter instead of downloading every
+# TransactionDetail row in the system and scanning it locally.
 dec_sc_ids = {t["transactionId"] for t in dec_sc if "2025-12-30" in t.get("date", "")}
-dec30_details = [d for d in all_td if d.get("transactionId", "") in dec_sc_ids]
-print(f"\nDec 30 stock count details: {len(dec30_details)}")
-
-# Show sample by store
-by_store = defaultdict(list)
-for d in dec30_details:
-    loc_id = d.get("locationId", "")
-    sn = loc_map.get(loc_id, "?")
-    by_store[sn].append(d)
-
-for sn in sorted(by_store.keys()):
-    details = by_store[sn]
-    print(f"\n{sn}: {len(details)} detail lines")
-
-    # Count by row type
-    by_type = defaultdict(int)
-    total_amt = 0
-    total_debit = 0
-    total_credit = 0
-    total_qty = 0
-    total_prev = 0
-    total_adj = 0
-    cogs_count = 0
-
-    for d in details:
-        rt = d.get("rowType", "?")
-        by_type[rt] += 1
-        gl_num = gl_map.get(d.get("glAccountId", ""), "")
-
-        if rt == "Detail" and gl_num.startswith("5"):
-            cogs_count += 1
-            total_amt += d.get("amount", 0) or 0
-            total_debit += d.get("debit", 0) or 0
-            total_credit += d.get("credit", 0) or 0
-            total_qty += d.get("quantity", 0) or 0
-            total_prev += d.get("previousCountTotal", 0) or 0
-            total_adj += d.get("adjustment", 0) or 0
-
-    print(f"  Row types: {dict(by_type)}")
-    print(f"  COGS (5xxx) Detail lines: {cogs_count}")
-    print(f"  Total amount: ${total_amt:,.2f}")
-    print(f"  Total debit: ${total_debit:,.2f}")
-    print(f"  Total credit: ${total_credit:,.2f}")
-    print(f"  Total quantity: {total_qty:,.2f}")
-    print(f"  Total previousCountTotal: ${total_prev:,.2f}")
-    print(f"  Total adjustment: ${total_adj:,.2f}")
+print("\nPulling Dec 30 stock count details...")
+rows = []
+id_list = sorted(dec_sc_ids)
+for i in range(0, len(id_list), 20):  # chunked to stay under URL length limits
+    flt = " or ".join(f"transactionId eq '{tid}'" for tid in id_list[i:i + 20])
+    rows.extend(iter_all(f"{BASE}/TransactionDetail?$filter={flt}"))
+print(f"\nDec 30 stock count details: {len(rows)}")
+
+if not rows:
+    raise SystemExit("No Dec 30 stock count details found")
+
+# Vectorized per-store aggregation - one C-level groupby/sum instead of six
+# Python sums per row.
+FIELDS = ["amount", "debit", "credit", "quantity", "previousCountTotal", "adjustment"]
+df = pd.DataFrame(rows)
+for col in FIELDS:
+    if col not in df:
+        df[col] = 0.0
+df[FIELDS] = df[FIELDS].fillna(0)
+df["store"] = df["locationId"].map(loc_map).fillna("?")
+cogs_mask = (df["rowType"] == "Detail") & df["glAccountId"].isin(COGS_GL_IDS)
+
+for sn, sdf in df.groupby("store", sort=True):
+    print(f"\n{sn}: {len(sdf)} detail lines")
+
+    cogs_sdf = sdf[cogs_mask.loc[sdf.index]]
+    totals = cogs_sdf[FIELDS].sum()
+
+    print(f"  Row types: {sdf['rowType'].fillna('?').value_counts().to_dict()}")
+    print(f"  COGS (5xxx) Detail lines: {len(cogs_sdf)}")
+    print(f"  Total amount: ${totals['amount']:,.2f}")
+    print(f"  Total debit: ${totals['debit']:,.2f}")
+    print(f"  Total credit: ${totals['credit']:,.2f}")
+    print(f"  Total quantity: {totals['quantity']:,.2f}")
+    print(f"  Total previousCountTotal: ${totals['previousCountTotal']:,.2f}")
+    print(f"  Total adjustment: ${totals['adjustment']:,.2f}")
 
     # Show first 3 detail lines raw
-    cogs_details = [d for d in details
-                    if d.get("rowType") == "Detail"
-                    and gl_map.get(d.get("glAccountId", ""), "").startswith("5")]
-    if cogs_details:
+    if len(cogs_sdf):
         print(f"  Sample lines:")
-        for d in cogs_details[:3]:
-            print(f"    amt={d.get('amount',0):.2f} debit={d.get('debit',0):.2f} "
-                  f"credit={d.get('credit',0):.2f} qty={d.get('quantity',0):.2f} "
-                  f"prev={d.get('previousCountTotal',0):.2f} adj={d.get('adjustment',0):.2f} "
-                  f"comment={d.get('comment','')[:30]}")
+        for _, d in cogs_sdf.head(3).iterrows():
+            print(f"    amt={d['amount']:.2f} debit={d['debit']:.2f} "
+                  f"credit={d['credit']:.2f} qty={d['quantity']:.2f} "
+                  f"prev={d['previousCountTotal']:.2f} adj={d['adjustment']:.2f} "
+                  f"comment={str(d.get('comment', ''))[:30]}")
@@ -20,13 +20,39 @@ GM Accountability:
   - Business week: Wednesday through Tuesday (matches fiscal calendar)
 """
 import base64
-import urllib.request
+import functools
+import heapq
+import itertools
 import json
+import operator
 import os
-import ssl
+import re
+import shutil
 import time
+
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter, Retry
+try:
+    import orjson  # faster C parse of large OData pages
+except ImportError:
+    orjson = None
+
+
+def _parse_response(resp):
+    """Parse an HTTP response body straight from bytes.
+    orjson when available (~3x faster on big TransactionDetail pages and
+    skips the bytes->str decode copy), else requests' stdlib parse.
+    """
+    if orjson:
+        return orjson.loads(resp.content)
+    return resp.json()
 from datetime import datetime, timedelta
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # ============================================================
 # CONFIG
@@ -45,10 +71,29 @@ from toast_config import (
 # R365 Auth
 R365_CRED = b'foragekitchen\x5chenry@foragekombucha.com:KingJames1!'
 R365_AUTH = base64.b64encode(R365_CRED).decode()
-R365_HEADERS = {"Authorization": "Basic " + R365_AUTH, "Accept": "application/json"}
+R365_HEADERS = {"Authorization": "Basic " + R365_AUTH,
+                # minimal metadata keeps OData annotation bloat out of payloads
+                "Accept": "application/json;odata.metadata=minimal"}
 R365_BASE = "https://odata.restaurant365.net/api/v2/views"
 
-SSL_CTX = ssl.create_default_context()
+# Pooled keep-alive sessions - connection reuse skips the TLS handshake that
+# was paid on every urllib call, and pooling lets the thread pool multiplex.
+# Transient 5xx responses retry at the adapter with a short exponential
+# backoff before the helpers' own slower retry loops kick in. 429 is left
+# out deliberately - toast_get handles Toast's rate limiting itself.
+def _pooled_adapter():
+    return HTTPAdapter(
+        pool_connections=16, pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=1,
+                          status_forcelist=[500, 502, 503, 504]))
+
+
+_R365_SESSION = requests.Session()
+_R365_SESSION.mount("https://", _pooled_adapter())
+_R365_SESSION.headers.update(R365_HEADERS)
+
+_TOAST_SESSION = requests.Session()
+_TOAST_SESSION.mount("https://", _pooled_adapter())
 
 # COGS GL account mapping
 COGS_GL_ACCOUNTS = {
@@ -74,14 +119,21 @@ STORE_NAMES = {k: v["name"] for k, v in SSS_CONFIG.items()}
 # ============================================================
 # R365 API HELPERS
 # ============================================================
+def odata_filter(flt):
+    """URL-encode an OData $filter expression once, at build time."""
+    return quote(flt, safe="'()")
+
+
 def r365_fetch(url, retries=3):
-    """Make authenticated GET request to R365 OData API."""
-    url = url.replace(" ", "%20")
+    """Make authenticated GET request to R365 OData API.
+    URLs must arrive fully encoded - filter expressions go through
+    odata_filter at the call site.
+    """
     for attempt in range(retries):
         try:
-            req = urllib.request.Request(url, headers=R365_HEADERS)
-            with urllib.request.urlopen(req, timeout=120) as resp:
-                return json.loads(resp.read().decode())
+            resp = _R365_SESSION.get(url, timeout=120)
+            resp.raise_for_status()
+            return _parse_response(resp)
         except Exception as e:
             if attempt < retries - 1:
                 wait = (attempt + 1) * 5
@@ -92,36 +144,49 @@ def r365_fetch(url, retries=3):
 
 
 def r365_fetch_all(url, max_records=50000):
-    """Fetch all records from an R365 OData endpoint with pagination."""
-    all_records = []
+    """Fetch all records from an R365 OData endpoint with pagination.
+    Pages are collected whole and flattened once at the end rather than
+    extending a single growing list 5000 items at a time.
+    """
+    pages = []
+    total = 0
     skip = 0
     while True:
         page_url = f"{url}{'&' if '?' in url else '?'}$top=5000&$skip={skip}"
-        data = r365_fetch(page_url)
-        records = data.get("value", [])
-        all_records.extend(records)
-        if len(records) < 5000 or len(all_records) >= max_records:
+        records = r365_fetch(page_url).get("value", [])
+        pages.append(records)
+        total += len(records)
+        if len(records) < 5000 or total >= max_records:
             break
         skip += 5000
-    return all_records
+    if len(pages) == 1:
+        return pages[0]
+    return list(itertools.chain.from_iterable(pages))
 
 
 # ============================================================
 # TOAST API HELPERS
 # ============================================================
+# Memoized bearer token - repeat calls reuse it until a minute before the
+# advertised expiry, so long runs (or scripts importing this module after
+# main already authenticated) never re-authenticate mid-flight.
+_TOAST_TOKEN = {"token": None, "expires_at": 0.0}
+
+
 def toast_authenticate():
     """Authenticate with Toast API and return bearer token."""
-    data = json.dumps({
+    if _TOAST_TOKEN["token"] and time.time() < _TOAST_TOKEN["expires_at"]:
+        return _TOAST_TOKEN["token"]
+    resp = _TOAST_SESSION.post(TOAST_AUTH_URL, json={
         "clientId": TOAST_CLIENT_ID,
         "clientSecret": TOAST_CLIENT_SECRET,
         "userAccessType": "TOAST_MACHINE_CLIENT"
-    }).encode()
-    req = urllib.request.Request(TOAST_AUTH_URL, data=data,
-                                headers={"Content-Type": "application/json"},
-                                method="POST")
-    with urllib.request.urlopen(req, context=SSL_CTX) as resp:
-        result = json.loads(resp.read())
-    return result["token"]["accessToken"]
+    }, timeout=120)
+    resp.raise_for_status()
+    token = _parse_response(resp)["token"]
+    _TOAST_TOKEN["token"] = token["accessToken"]
+    _TOAST_TOKEN["expires_at"] = time.time() + token.get("expiresIn", 3600) - 60
+    return _TOAST_TOKEN["token"]
 
 
 def toast_get(url, token, restaurant_guid, retries=3):
@@ -131,44 +196,60 @@ def toast_get(url, token, restaurant_guid, retries=3):
         "Toast-Restaurant-External-ID": restaurant_guid
     }
     for attempt in range(retries):
-        try:
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, context=SSL_CTX, timeout=120) as resp:
-                return json.loads(resp.read())
-        except urllib.error.HTTPError as e:
-            if e.code == 429 and attempt < retries - 1:
-                wait = (attempt + 1) * 5
-                print(f"\n      Rate limited (429), waiting {wait}s...", end="", flush=True)
-                time.sleep(wait)
-            else:
-                raise
+        resp = _TOAST_SESSION.get(url, headers=headers, timeout=120)
+        if resp.status_code == 429 and attempt < retries - 1:
+            wait = (attempt + 1) * 5
+            print(f"\n      Rate limited (429), waiting {wait}s...", end="", flush=True)
+            time.sleep(wait)
+            continue
+        resp.raise_for_status()
+        return _parse_response(resp)
+
+
+def _sum_orders(orders):
+    """Net sales for one page of Toast orders, skipping voided orders/checks."""
+    return sum(check.get("amount") or 0
+               for order in orders if not order.get("voided")
+               for check in order.get("checks", ())
+               if not check.get("voided"))
 
 
 def pull_toast_sales_day(token, guid, date):
-    """Pull net sales from Toast for a single day."""
+    """Pull net sales from Toast for a single day.
+    Page 1 is fetched synchronously; if it comes back full, pages 2..N are
+    fetched speculatively in parallel batches instead of one RTT per page.
+    A short page anywhere in a batch marks the end of the day's orders.
+    """
     biz_date = date.strftime("%Y%m%d")
-    net_sales = 0
-    page = 1
-    while True:
-        url = (f"{TOAST_API_BASE}/orders/v2/ordersBulk"
-               f"?businessDate={biz_date}&pageSize=100&page={page}")
-        orders = toast_get(url, token, guid)
-        for order in orders:
-            if order.get("voided"):
-                continue
-            for check in order.get("checks", []):
-                if check.get("voided"):
-                    continue
-                net_sales += (check.get("amount") or 0)
-        if len(orders) < 100:
-            break
-        page += 1
+
+    def page_url(page):
+        return (f"{TOAST_API_BASE}/orders/v2/ordersBulk"
+                f"?businessDate={biz_date}&pageSize=100&page={page}")
+
+    orders = toast_get(page_url(1), token, guid)
+    net_sales = _sum_orders(orders)
+    if len(orders) < 100:
+        return round(net_sales, 2)
+
+    page = 2
+    done = False
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        while not done:
+            batch = [pool.submit(toast_get, page_url(p), token, guid)
+                     for p in range(page, page + 4)]
+            page += 4
+            for fut in batch:
+                orders = fut.result()
+                net_sales += _sum_orders(orders)
+                if len(orders) < 100:
+                    done = True
     return round(net_sales, 2)
 
 
 # ============================================================
 # 4-4-5 FISCAL CALENDAR
 # ============================================================
+@functools.lru_cache(maxsize=8)
 def get_445_periods(fy_start_str):
     fy_start = datetime.strptime(fy_start_str, "%Y-%m-%d")
     periods = []
@@ -189,7 +270,13 @@ def get_445_periods(fy_start_str):
 
 def get_current_period():
     """Determine which fiscal year and period today falls in."""
-    today = datetime.now()
+    return _current_period_for(datetime.now().date())
+
+
+@functools.lru_cache(maxsize=1)
+def _current_period_for(today_date):
+    """Cached on today's date so the answer rolls over at midnight."""
+    today = datetime(today_date.year, today_date.month, today_date.day)
     for fy_year in sorted(FISCAL_YEAR_STARTS.keys(), reverse=True):
         periods = get_445_periods(FISCAL_YEAR_STARTS[fy_year])
         for p in periods:
@@ -230,115 +317,207 @@ def get_cache_path(cache_key):
 def load_cache(cache_key):
     path = get_cache_path(cache_key)
     if os.path.exists(path):
-        with open(path, "r") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return orjson.loads(f.read()) if orjson else json.load(f)
     return {}
 
 
 def save_cache(cache_key, data):
+    # Compact JSON (no indent) serializes faster and reads back smaller;
+    # the temp-file rename keeps a crashed run from leaving a truncated
+    # cache that every later run would choke on.
+    path = get_cache_path(cache_key)
+    tmp_path = path + ".tmp"
+    if orjson:
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(data))
+    else:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def period_cached(cache_key, period_end, fetch_fn):
+    """Period-scoped API cache. A period that closed more than a week ago
+    never changes, so its cache file is authoritative forever; the active
+    period's pull is reused for up to an hour between runs.
+    """
+    path = get_cache_path(cache_key)
+    if os.path.exists(path):
+        closed = period_end < datetime.now() - timedelta(days=7)
+        if closed or time.time() - os.path.getmtime(path) < 3600:
+            return load_cache(cache_key)
+    data = fetch_fn()
+    save_cache(cache_key, data)
+    return data
+
+
+def cached_fetch(cache_key, ttl_hours, fetch_fn):
+    """Fetch via fetch_fn, memoized to CACHE_DIR for ttl_hours."""
     path = get_cache_path(cache_key)
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+    if os.path.exists(path) and time.time() - os.path.getmtime(path) < ttl_hours * 3600:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read()) if orjson else json.load(f)
+    data = fetch_fn()
+    save_cache(cache_key, data)
+    return data
 
 
 # ============================================================
 # R365 DATA PULL
 # ============================================================
 def load_r365_reference():
-    """Load locations and GL accounts from R365."""
-    print("  Loading R365 locations...")
-    locations = r365_fetch(R365_BASE + "/Location").get("value", [])
-    loc_map = {}
-    for loc in locations:
-        loc_map[loc["locationId"]] = {
-            "number": loc.get("locationNumber", ""),
-            "name": loc.get("name", "")
+    """Load locations, GL accounts, and items from R365.
+    The derived id->info maps are what callers use, so the cache persists
+    those: warm runs load one file and skip both the three network pulls
+    and the per-run map rebuild (Items is tens of thousands of rows).
+    24h TTL - reference data changes rarely.
+    """
+    def build():
+        print("  Loading R365 locations...")
+        locations = r365_fetch(
+            R365_BASE + "/Location?$select=locationId,locationNumber,name"
+        ).get("value", [])
+        loc_map = {
+            loc["locationId"]: {
+                "number": loc.get("locationNumber", ""),
+                "name": loc.get("name", "")
+            } for loc in locations
         }
-    print(f"    {len(loc_map)} locations")
-
-    print("  Loading R365 GL accounts...")
-    gl_accounts = r365_fetch(R365_BASE + "/GlAccount?$top=1000").get("value", [])
-    gl_map = {}
-    for acct in gl_accounts:
-        gl_map[acct["glAccountId"]] = {
-            "number": acct.get("glAccountNumber", ""),
-            "name": acct.get("name", "")
+        print(f"    {len(loc_map)} locations")
+
+        print("  Loading R365 GL accounts...")
+        gl_accounts = r365_fetch(
+            R365_BASE + "/GlAccount?$top=1000"
+            "&$select=glAccountId,glAccountNumber,name").get("value", [])
+        gl_map = {
+            acct["glAccountId"]: {
+                "number": acct.get("glAccountNumber", ""),
+                "name": acct.get("name", "")
+            } for acct in gl_accounts
         }
-    print(f"    {len(gl_map)} GL accounts")
-
-    print("  Loading R365 items...")
-    items = r365_fetch_all(R365_BASE + "/Item")
-    item_map = {}
-    for item in items:
-        item_map[item["itemId"]] = {
-            "name": item.get("name", ""),
-            "category1": item.get("category1", ""),
-            "category2": item.get("category2", ""),
+        print(f"    {len(gl_map)} GL accounts")
+
+        print("  Loading R365 items...")
+        items = r365_fetch_all(
+            R365_BASE + "/Item?$select=itemId,name,category1,category2")
+        item_map = {
+            item["itemId"]: {
+                "name": item.get("name", ""),
+                "category1": item.get("category1", ""),
+                "category2": item.get("category2", ""),
+            } for item in items
         }
-    print(f"    {len(item_map)} items")
+        print(f"    {len(item_map)} items")
+
+        return {"locations": loc_map, "gl_accounts": gl_map, "items": item_map}
+
+    maps = cached_fetch("ref_maps", 24, build)
+    return maps["locations"], maps["gl_accounts"], maps["items"]
 
-    return loc_map, gl_map, item_map
 
+# Transaction columns the pipeline reads - projected server-side so the
+# rest of the (wide) Transaction view never crosses the wire
+_TXN_SELECT = "transactionId,type,date,name,isApproved,locationId"
 
-def pull_transactions_for_period(period_start, period_end):
+
+def pull_transactions_for_period(period_start, period_end, cache_key=None):
     """Pull all COGS-related transactions for a fiscal period from R365.
     R365 requires date filters with max 31-day range, so we chunk by month.
     Stock Counts get +1 day grace period since GMs sometimes complete
     period-end counts on Wednesday morning (day after period close).
+    With a cache_key, results are memoized per period via period_cached.
     """
-    all_transactions = []
-    current = period_start
+    if cache_key:
+        return period_cached(
+            f"txn_{cache_key}", period_end,
+            lambda: pull_transactions_for_period(period_start, period_end))
     # Extend pull window by 1 day for stock counts entered morning after close
     pull_end = period_end + timedelta(days=1)
-
+    # All five types in one predicate - one HTTP round-trip per month chunk
+    # instead of five
+    type_filter = " or ".join(f"type eq '{t}'" for t in COGS_TXN_TYPES)
+    cutoff_str = period_end.strftime("%Y-%m-%dT23:59:59Z")
+
+    # Build the month-chunk ranges up front, then fetch them concurrently -
+    # the chunks are independent date windows, so a multi-month range costs
+    # one round-trip of latency instead of one per chunk.
+    chunks = []
+    current = period_start
     while current <= pull_end:
         # Chunk end: up to 31 days or pull end
         chunk_end = min(current + timedelta(days=30), pull_end)
-        start_str = current.strftime("%Y-%m-%dT00:00:00Z")
-        end_str = chunk_end.strftime("%Y-%m-%dT23:59:59Z")
-
-        for txn_type in COGS_TXN_TYPES:
-            # Only extend the grace day for Stock Counts
-            if txn_type != "Stock Count":
-                txn_end = min(chunk_end, period_end)
-                txn_end_str = txn_end.strftime("%Y-%m-%dT23:59:59Z")
-            else:
-                txn_end_str = end_str
-            url = (f"{R365_BASE}/Transaction?$top=5000"
-                   f"&$filter=type eq '{txn_type}'"
-                   f" and date ge {start_str}"
-                   f" and date le {txn_end_str}")
-            try:
-                data = r365_fetch(url)
-                records = data.get("value", [])
-                all_transactions.extend(records)
-            except Exception as e:
-                print(f"    Error pulling {txn_type} for {current.strftime('%Y-%m-%d')}-{chunk_end.strftime('%Y-%m-%d')}: {e}")
-
+        chunks.append((current, chunk_end))
         current = chunk_end + timedelta(days=1)
 
-    return all_transactions
+    def fetch_chunk(chunk):
+        chunk_start, chunk_end = chunk
+        start_str = chunk_start.strftime("%Y-%m-%dT00:00:00Z")
+        end_str = chunk_end.strftime("%Y-%m-%dT23:59:59Z")
+        flt = (f"({type_filter})"
+               f" and date ge {start_str}"
+               f" and date le {end_str}")
+        url = (f"{R365_BASE}/Transaction?$top=5000"
+               f"&$select={_TXN_SELECT}&$filter={odata_filter(flt)}")
+        try:
+            records = r365_fetch(url).get("value", [])
+            # Only Stock Counts keep the grace day past period close
+            return [t for t in records
+                    if t.get("type") == "Stock Count" or t.get("date", "") <= cutoff_str]
+        except Exception as e:
+            print(f"    Error pulling transactions for {chunk_start.strftime('%Y-%m-%d')}-{chunk_end.strftime('%Y-%m-%d')}: {e}")
+            return []
+
+    if len(chunks) == 1:
+        return fetch_chunk(chunks[0])
+    with ThreadPoolExecutor(max_workers=min(8, len(chunks))) as pool:
+        return list(itertools.chain.from_iterable(pool.map(fetch_chunk, chunks)))
 
 
-def pull_transaction_details(transaction_ids):
+def pull_transaction_details(transaction_ids, cache_key=None, period_end=None):
     """Pull TransactionDetail rows for given transaction IDs.
-    We pull all details and filter in memory since the API doesn't support
-    filtering by transactionId directly.
+    The transactionId predicate is pushed into the OData $filter in chunks
+    of 50 ids, so only the rows we want ever leave the server - instead of
+    paging the entire TransactionDetail table and discarding >95% locally.
+    With a cache_key, results are memoized per period via period_cached.
     """
-    all_details = r365_fetch_all(R365_BASE + "/TransactionDetail")
-    txn_id_set = set(transaction_ids)
-    return [td for td in all_details if td.get("transactionId", "") in txn_id_set]
-
-
+    if cache_key:
+        return period_cached(
+            f"details_{cache_key}", period_end,
+            lambda: pull_transaction_details(transaction_ids))
+    id_list = sorted(set(transaction_ids))
+    # chunked to stay under URL length limits
+    chunks = [id_list[i:i + 50] for i in range(0, len(id_list), 50)]
+
+    # Project only the columns the pipeline reads - detail rows carry many
+    # more fields, and dropping them server-side shrinks both the payload
+    # and the JSON parse.
+    select = ("transactionId,locationId,rowType,glAccountId,itemId,"
+              "debit,credit,amount,quantity,previousCountTotal,"
+              "adjustment,comment,unitOfMeasureName")
+
+    def fetch_chunk(chunk):
+        flt = " or ".join(f"transactionId eq '{tid}'" for tid in chunk)
+        return r365_fetch_all(
+            f"{R365_BASE}/TransactionDetail?$select={select}"
+            f"&$filter={odata_filter(flt)}")
+
+    # Chunks are independent - fan them out across the pooled connections
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        return list(itertools.chain.from_iterable(pool.map(fetch_chunk, chunks)))
+
+
+@functools.lru_cache(maxsize=4096)
 def extract_vendor_name(txn_name):
     """Extract vendor name from transaction name.
     Format: 'AP Invoice - VENDOR NAME - INVOICE#'
+    Cached - vendor names repeat heavily across a period's invoices.
     """
     if not txn_name:
         return "Unknown"
-    parts = txn_name.split(" - ")
-    if len(parts) >= 2:
-        return parts[1].strip()
+    _, sep, rest = txn_name.partition(" - ")
+    if sep:
+        return rest.partition(" - ")[0].strip()
     return txn_name
 
 
@@ -347,48 +526,77 @@ def extract_vendor_name(txn_name):
 # ============================================================
 def pull_period_sales(token, period_start, period_end, cache_key):
     """Pull daily net sales from Toast for all stores in a period.
-    Uses cache for completed days.
+    token may be None - authentication then happens lazily, and only if
+    some store-day is missing from the cache.
+    Uses cache for completed days; uncached store-days are fetched in
+    parallel (I/O-bound - urlopen releases the GIL, and toast_get already
+    handles 429 backoff, so the executor cap replaces the old sleep(0.1)).
+    The day cache is one file shared across periods, so days near a period
+    boundary never get re-pulled for the neighbouring period's run.
     Returns: {store_num: {date_str: net_sales}}
     """
     today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     yesterday = today - timedelta(days=1)
     data_end = min(yesterday, period_end)
 
+    sales_cache = load_cache("toast_sales")  # {store_num: {date_str: net_sales}}
     store_sales = {}
+    from_cache = defaultdict(int)
+    from_api = defaultdict(int)
+    pending = []  # (store_num, guid, date, date_str) still needing an API pull
+
+    # The period's day list (and its date strings) is the same for every
+    # store - build it once instead of re-walking the range per store
+    period_days = []
+    current = period_start
+    while current <= data_end:
+        period_days.append((current, current.strftime("%Y-%m-%d")))
+        current += timedelta(days=1)
+
     for store_num in sorted(TOAST_RESTAURANTS.keys()):
         restaurant = TOAST_RESTAURANTS[store_num]
-        store_cache = load_cache(f"{cache_key}_cogs_sales_{store_num}")
+        store_cache = sales_cache.setdefault(store_num, {})
         daily = {}
-        from_cache = 0
-        from_api = 0
-
-        current = period_start
-        while current <= data_end:
-            date_str = current.strftime("%Y-%m-%d")
-            if date_str in store_cache and current < yesterday:
+        for day, date_str in period_days:
+            if date_str in store_cache and day < yesterday:
                 daily[date_str] = store_cache[date_str]
-                from_cache += 1
+                from_cache[store_num] += 1
             else:
+                pending.append((store_num, restaurant["guid"], day, date_str))
+        store_sales[store_num] = daily
+
+    if pending:
+        # Authenticate only when something actually needs fetching - a
+        # fully cached (closed) period never talks to Toast at all
+        if token is None:
+            token = toast_authenticate()
+        # At least one worker per restaurant so a cold-cache run fans out
+        # across every store at once instead of queueing behind the pool.
+        with ThreadPoolExecutor(
+                max_workers=max(8, len(TOAST_RESTAURANTS))) as pool:
+            futures = {
+                pool.submit(pull_toast_sales_day, token, guid, d): (sn, ds)
+                for sn, guid, d, ds in pending
+            }
+            for fut in as_completed(futures):
+                sn, date_str = futures[fut]
                 try:
-                    ns = pull_toast_sales_day(token, restaurant["guid"], current)
-                    daily[date_str] = ns
-                    from_api += 1
-                    time.sleep(0.1)
+                    store_sales[sn][date_str] = fut.result()
+                    from_api[sn] += 1
                 except Exception as e:
-                    print(f"      Sales error {store_num} {date_str}: {e}")
-                    daily[date_str] = 0
-            current += timedelta(days=1)
+                    print(f"      Sales error {sn} {date_str}: {e}")
+                    store_sales[sn][date_str] = 0
 
-        # Save cache
-        for ds, ns in daily.items():
-            store_cache[ds] = ns
-        save_cache(f"{cache_key}_cogs_sales_{store_num}", store_cache)
+    for store_num in sorted(TOAST_RESTAURANTS.keys()):
+        daily = store_sales[store_num]
+        sales_cache[store_num].update(daily)
 
-        store_sales[store_num] = daily
         total = sum(daily.values())
         print(f"    {store_num} {STORE_NAMES.get(store_num, '')}: "
-              f"{len(daily)} days (cached: {from_cache}, pulled: {from_api}), ${total:,.0f}")
+              f"{len(daily)} days (cached: {from_cache[store_num]}, "
+              f"pulled: {from_api[store_num]}), ${total:,.0f}")
 
+    save_cache("toast_sales", sales_cache)
     return store_sales
 
 
@@ -453,6 +661,16 @@ def main():
 
     cache_key = f"FY{fy}_P{period}"
 
+    # Start the network pulls that have no mutual dependency right away so
+    # they overlap: the R365 transaction pull runs on a worker thread while
+    # reference data loads on the main thread. Later the detail pull and
+    # the Toast sales pull overlap the same way. Toast auth happens lazily
+    # inside the sales pull, only if any day actually needs fetching - a
+    # closed period served entirely from cache touches no network at all.
+    pool = ThreadPoolExecutor(max_workers=3)
+    txn_future = pool.submit(pull_transactions_for_period,
+                             period_start, period_end, cache_key)
+
     # --------------------------------------------------------
     # Step 1: Load R365 reference data
     # --------------------------------------------------------
@@ -466,14 +684,18 @@ def main():
         if num in COGS_GL_ACCOUNTS:
             gl_to_cogs_cat[gl_id] = COGS_GL_ACCOUNTS[num]
 
-    # Build location ID -> store number lookup
-    loc_id_to_num = {lid: info["number"] for lid, info in loc_map.items()}
+    # Build location ID -> store number lookup, restricted to tracked
+    # stores - mapping through it yields NaN for anything else, so the
+    # known-store test below is a null check instead of a second lookup
+    # against STORE_NAMES.
+    loc_id_to_num = {lid: info["number"] for lid, info in loc_map.items()
+                     if info["number"] in STORE_NAMES}
 
     # --------------------------------------------------------
     # Step 2: Pull COGS transactions from R365
     # --------------------------------------------------------
     print(f"\n[2/5] Pulling COGS transactions from R365 (FY{fy} P{period})...")
-    transactions = pull_transactions_for_period(period_start, period_end)
+    transactions = txn_future.result()
 
     # Organize transactions by type
     txn_by_type = defaultdict(list)
@@ -489,18 +711,22 @@ def main():
     begin_inv_end = period_start  # include period start for grace
     print(f"\n  Pulling beginning inventory counts "
           f"({begin_inv_start.strftime('%m/%d')} - {begin_inv_end.strftime('%m/%d')})...")
-    begin_inv_url = (
-        f"{R365_BASE}/Transaction?$top=5000"
-        f"&$filter=type eq 'Stock Count'"
+    begin_inv_flt = (
+        f"type eq 'Stock Count'"
         f" and date ge {begin_inv_start.strftime('%Y-%m-%dT00:00:00Z')}"
         f" and date le {begin_inv_end.strftime('%Y-%m-%dT23:59:59Z')}"
     )
-    try:
-        begin_inv_data = r365_fetch(begin_inv_url)
-        begin_inv_txns = begin_inv_data.get("value", [])
-    except Exception as e:
-        begin_inv_txns = []
-        print(f"    Error: {e}")
+    begin_inv_url = (f"{R365_BASE}/Transaction?$top=5000"
+                     f"&$select={_TXN_SELECT}"
+                     f"&$filter={odata_filter(begin_inv_flt)}")
+    # Cached like the main transaction pull - begin-inv counts are immutable
+    # once the grace window passes, and a fetch failure should fail loudly
+    # rather than silently zero begin inventory (the details cache would
+    # still hold the rows, reclassifying the count as an in-period week-0
+    # stock count).
+    begin_inv_txns = period_cached(
+        f"begininv_{cache_key}", period_end,
+        lambda: r365_fetch(begin_inv_url).get("value", []))
 
     begin_inv_txn_ids = set(t["transactionId"] for t in begin_inv_txns)
     print(f"    {len(begin_inv_txns)} beginning inventory stock counts found")
@@ -516,7 +742,12 @@ def main():
     # --------------------------------------------------------
     print(f"\n[3/5] Pulling transaction details...")
     txn_ids = [t["transactionId"] for t in transactions]
-    details = pull_transaction_details(txn_ids)
+    details_future = pool.submit(pull_transaction_details,
+                                 txn_ids, cache_key, period_end)
+    # Toast sales have no dependency on the details - pull them in parallel
+    sales_future = pool.submit(pull_period_sales, None,
+                               period_start, period_end, cache_key)
+    details = details_future.result()
     print(f"    {len(details)} detail lines matched")
 
     # Build txn lookup
@@ -527,66 +758,118 @@ def main():
     # --------------------------------------------------------
     print(f"\n[4/5] Processing COGS data...")
 
-    # Structure: {week_idx: {store_num: {metric: value}}}
-    week_data = defaultdict(lambda: defaultdict(lambda: {
-        "purchases_food": 0, "purchases_packaging": 0, "purchases_beverage": 0,
-        "purchases_other": 0, "purchases_total": 0,
-        "credits": 0,
-        "waste": 0,
-        "net_purchases": 0,
-        "inventory_begin": 0, "inventory_end": 0, "inventory_adjustment": 0,
-        "has_stock_count": False, "stock_count_date": None,
-        "invoices_total": 0, "invoices_approved": 0, "invoices_unapproved": 0,
-        "vendors": defaultdict(float),
-        "waste_items": [],
-    }))
-
-    # Also track period-level totals
-    period_data = defaultdict(lambda: {
-        "purchases_food": 0, "purchases_packaging": 0, "purchases_beverage": 0,
-        "purchases_other": 0, "purchases_total": 0,
-        "credits": 0, "waste": 0, "net_purchases": 0,
-        "inventory_begin": 0, "inventory_end": 0,
-        "has_stock_count": False,
-        "invoices_total": 0, "invoices_approved": 0,
-        "vendors": defaultdict(float),
-    })
+    # Dense metric table instead of nested per-cell dicts: one float64
+    # array of shape (weeks, stores, metrics). Per-week net purchases and
+    # the period totals fall out as whole-array operations. Vendors, waste
+    # line items, and stock-count dates (non-numeric) stay in keyed dicts.
+    store_numbers = sorted(STORE_NAMES.keys())
+    s_ix = {sn: i for i, sn in enumerate(store_numbers)}
+    WEEK_METRICS = [
+        "purchases_food", "purchases_packaging", "purchases_beverage",
+        "purchases_other", "purchases_total", "credits", "waste",
+        "net_purchases", "inventory_begin", "inventory_end",
+        "inventory_adjustment", "invoices_total", "invoices_approved",
+        "invoices_unapproved", "has_stock_count",
+    ]
+    m_ix = {m: i for i, m in enumerate(WEEK_METRICS)}
+    week_metrics = np.zeros(
+        (len(period_weeks), len(store_numbers), len(WEEK_METRICS)))
+    week_vendors = defaultdict(lambda: defaultdict(float))  # (wi, sn) -> vendor -> $
+    week_waste_items = defaultdict(list)                    # (wi, sn) -> [items]
+    stock_count_dates = {}                                  # (wi, sn) -> date str
+
+    period_start_date = period_start.date()
+    period_total_days = (period_end.date() - period_start_date).days
+
+    @functools.lru_cache(maxsize=None)
+    def parse_iso(dt_str):
+        """Memoized ISO parse - transaction dates repeat heavily."""
+        try:
+            return datetime.fromisoformat(dt_str.replace("Z", "+00:00")).replace(tzinfo=None)
+        except:
+            return None
 
     def date_to_week_idx(dt):
-        """Map a date to the week index within the period."""
+        """Map a date to the week index within the period.
+        Weeks are contiguous 7-day blocks from period start, so the index
+        is plain day arithmetic - no lookup table over the period days.
+        """
         if isinstance(dt, str):
-            try:
-                dt = datetime.fromisoformat(dt.replace("Z", "+00:00")).replace(tzinfo=None)
-            except:
+            dt = parse_iso(dt)
+            if dt is None:
                 return None
-        for i, week in enumerate(period_weeks):
-            if week["start"] <= dt <= week["end"]:
-                return i
-        return None
-
-    # First pass: process beginning inventory stock counts (prior period end)
+        delta = (dt.date() - period_start_date).days
+        return delta // 7 if 0 <= delta <= period_total_days else None
+
+    # Join details to their transactions as DataFrame columns, then every
+    # aggregation below is a C-level groupby/sum over column masks instead
+    # of per-row Python branching.
+    ddf = pd.DataFrame(details, columns=[
+        "transactionId", "locationId", "rowType", "glAccountId", "itemId",
+        "debit", "credit", "amount", "quantity", "previousCountTotal",
+        "adjustment", "comment", "unitOfMeasureName"])
+    # The raw row dicts (~0.5KB each across tens of thousands of rows) are
+    # redundant once the columnar frame exists - free them rather than hold
+    # the period's details in memory twice.
+    del details
+    for col in ("debit", "credit", "amount", "quantity",
+                "previousCountTotal", "adjustment"):
+        ddf[col] = ddf[col].fillna(0)
+
+    # One pass over txn_lookup builds every per-transaction column map -
+    # vendor extraction, the ISO parse and the week assignment run once per
+    # transaction here, never per detail row.
+    grace_date = (period_end + timedelta(days=1)).date()
+    last_week_idx = len(period_weeks) - 1
+    txn_type_map, txn_date_map, txn_vendor, txn_approved, txn_loc = {}, {}, {}, {}, {}
+    txn_wi = {}
+    grace_logged = set()
+    for tid, t in txn_lookup.items():
+        ttype = t.get("type", "")
+        dstr = t.get("date", "")
+        txn_type_map[tid] = ttype
+        txn_date_map[tid] = dstr
+        txn_vendor[tid] = extract_vendor_name(t.get("name", ""))
+        txn_approved[tid] = bool(t.get("isApproved", False))
+        txn_loc[tid] = t.get("locationId", "")
+        dt = parse_iso(dstr)
+        wi = date_to_week_idx(dt) if dt is not None else None
+        # Stock Counts get 1-day grace: if dated day after period end,
+        # assign to last week (GMs sometimes complete counts Wed morning)
+        if wi is None and ttype == "Stock Count" and dt is not None \
+                and dt.date() == grace_date:
+            wi = last_week_idx
+            if dstr not in grace_logged:
+                grace_logged.add(dstr)
+                print(f"    Note: Stock Count dated {dstr[:10]} (day after period end) -> assigned to Week {last_week_idx + 1}")
+        txn_wi[tid] = wi
+
+    tid_col = ddf["transactionId"]
+    ddf["txn_type"] = tid_col.map(txn_type_map)
+    ddf["txn_date_str"] = tid_col.map(txn_date_map)
+    ddf["vendor"] = tid_col.map(txn_vendor)
+    ddf["approved"] = tid_col.map(txn_approved)
+
+    # Store: detail row's location, falling back to the parent transaction's
+    loc_id_col = ddf["locationId"].fillna("")
+    loc_id_col = loc_id_col.where(loc_id_col != "", tid_col.map(txn_loc))
+    ddf["store"] = loc_id_col.map(loc_id_to_num)
+
+    ddf["gl_num"] = ddf["glAccountId"].map(
+        {gid: info.get("number", "") for gid, info in gl_map.items()}).fillna("")
+    ddf["bucket"] = ddf["glAccountId"].map(gl_to_cogs_cat)
+    ddf["week_idx"] = tid_col.map(txn_wi)
+
+    is_detail = ddf["rowType"] == "Detail"
+    known_store = ddf["store"].notna()
+    is_begin_inv = tid_col.isin(begin_inv_txn_ids)
+    gl5 = ddf["gl_num"].str.startswith("5")
+
+    # Beginning inventory (prior period-end counts)
     begin_inventory = defaultdict(float)  # {store_num: total $}
-    for td in details:
-        txn_id = td.get("transactionId", "")
-        if txn_id not in begin_inv_txn_ids:
-            continue
-        txn = txn_lookup.get(txn_id)
-        if not txn:
-            continue
-        row_type = td.get("rowType", "")
-        if row_type != "Detail":
-            continue
-        loc_id = td.get("locationId") or txn.get("locationId", "")
-        store_num = loc_id_to_num.get(loc_id, "Unknown")
-        if store_num == "Unknown" or store_num not in STORE_NAMES:
-            continue
-        gl_id = td.get("glAccountId", "")
-        gl_info = gl_map.get(gl_id, {})
-        gl_num = gl_info.get("number", "")
-        if not gl_num.startswith("5"):
-            continue
-        amount = td.get("amount", 0) or 0
-        begin_inventory[store_num] += amount
+    begin_inventory.update(
+        ddf.loc[is_begin_inv & is_detail & known_store & gl5]
+        .groupby("store", sort=False)["amount"].sum().to_dict())
 
     if begin_inventory:
         print(f"\n  Beginning inventory (prior period-end counts):")
@@ -596,173 +879,115 @@ def main():
     else:
         print(f"\n  No beginning inventory counts found")
 
-    # Second pass: process period transactions (skip beginning inventory)
-    _grace_logged = set()  # Track which grace-period stock counts we've already logged
-    for td in details:
-        txn_id = td.get("transactionId", "")
-        # Skip beginning inventory transactions
-        if txn_id in begin_inv_txn_ids:
-            continue
-        txn = txn_lookup.get(txn_id)
-        if not txn:
-            continue
-
-        txn_type = txn.get("type", "")
-        txn_date_str = txn.get("date", "")
-        txn_date = None
-        try:
-            txn_date = datetime.fromisoformat(txn_date_str.replace("Z", "+00:00")).replace(tzinfo=None)
-        except:
-            continue
-
-        week_idx = date_to_week_idx(txn_date)
-        # Stock Counts get 1-day grace: if dated day after period end,
-        # assign to last week (GMs sometimes complete counts Wed morning)
-        if week_idx is None and txn_type == "Stock Count":
-            grace_end = period_end + timedelta(days=1)
-            if txn_date.date() == grace_end.date():
-                week_idx = len(period_weeks) - 1
-                if txn_id not in _grace_logged:
-                    _grace_logged.add(txn_id)
-                    print(f"    Note: Stock Count dated {txn_date_str[:10]} (day after period end) -> assigned to Week {week_idx + 1}")
-        if week_idx is None:
-            continue
-
-        # Determine store
-        loc_id = td.get("locationId") or txn.get("locationId", "")
-        store_num = loc_id_to_num.get(loc_id, "Unknown")
-        if store_num == "Unknown" or store_num not in STORE_NAMES:
-            continue
-
-        row_type = td.get("rowType", "")
-        gl_id = td.get("glAccountId", "")
-        gl_info = gl_map.get(gl_id, {})
-        gl_num = gl_info.get("number", "")
-        debit = td.get("debit", 0) or 0
-        credit = td.get("credit", 0) or 0
-        amount = td.get("amount", 0) or 0
-        quantity = td.get("quantity", 0) or 0
-
-        wd = week_data[week_idx][store_num]
-        pd = period_data[store_num]
-
-        if txn_type == "AP Invoice" and row_type == "Detail":
-            # Categorize by GL account
-            cogs_cat = gl_to_cogs_cat.get(gl_id, None)
-            if gl_num.startswith("5"):
-                if cogs_cat == "Food":
-                    wd["purchases_food"] += debit
-                    pd["purchases_food"] += debit
-                elif cogs_cat == "Packaging":
-                    wd["purchases_packaging"] += debit
-                    pd["purchases_packaging"] += debit
-                elif cogs_cat == "Beverage":
-                    wd["purchases_beverage"] += debit
-                    pd["purchases_beverage"] += debit
-                else:
-                    wd["purchases_other"] += debit
-                    pd["purchases_other"] += debit
-                wd["purchases_total"] += debit
-                pd["purchases_total"] += debit
-
-            # Track vendor
-            vendor = extract_vendor_name(txn.get("name", ""))
-            wd["vendors"][vendor] += debit
-            pd["vendors"][vendor] += debit
-
-            # Track invoice approval
-            wd["invoices_total"] += 1
-            pd["invoices_total"] += 1
-            if txn.get("isApproved", False):
-                wd["invoices_approved"] += 1
-                pd["invoices_approved"] += 1
-            else:
-                wd["invoices_unapproved"] += 1
-
-        elif txn_type == "AP Credit Memo" and row_type == "Detail":
-            if gl_num.startswith("5"):
-                wd["credits"] += credit
-                pd["credits"] += credit
-
-        elif txn_type == "Waste Log" and row_type == "Detail":
-            waste_amt = abs(amount) if amount < 0 else debit
-            wd["waste"] += waste_amt
-            pd["waste"] += waste_amt
-            # Track waste items
-            item_info = item_map.get(td.get("itemId", ""), {})
-            wd["waste_items"].append({
-                "item": item_info.get("name", td.get("comment", "Unknown")),
-                "qty": abs(quantity),
-                "uom": td.get("unitOfMeasureName", ""),
-                "amount": waste_amt,
+    # Period rows: inside a week, known store, not beginning inventory
+    base = ~is_begin_inv & is_detail & known_store & ddf["week_idx"].notna()
+    # One groupby partitions the in-period rows by transaction type; each
+    # handler below takes its slice instead of re-masking ddf with a fresh
+    # full-column type comparison per transaction type.
+    _empty = ddf.iloc[0:0]
+    by_type = dict(iter(ddf.loc[base].groupby("txn_type", sort=False)))
+
+    # Purchases by COGS category (5xxx GL only)
+    inv = by_type.get("AP Invoice", _empty)
+    purch = inv.loc[gl5.loc[inv.index]]
+    cat = purch["bucket"].where(
+        purch["bucket"].isin(("Food", "Packaging", "Beverage")), "Other")
+    for (wi, sn, b), v in purch.groupby(
+            [purch["week_idx"], purch["store"], cat],
+            sort=False)["debit"].sum().items():
+        cell = week_metrics[int(wi), s_ix[sn]]
+        cell[m_ix[f"purchases_{b.lower()}"]] += v
+        cell[m_ix["purchases_total"]] += v
+
+    # Vendor totals and invoice approval counts (all AP Invoice detail rows)
+    for (wi, sn, vendor), v in inv.groupby(
+            ["week_idx", "store", "vendor"], sort=False)["debit"].sum().items():
+        week_vendors[(int(wi), sn)][vendor] += v
+    for (wi, sn), row in inv.groupby(
+            ["week_idx", "store"],
+            sort=False)["approved"].agg(["size", "sum"]).iterrows():
+        total, approved = int(row["size"]), int(row["sum"])
+        cell = week_metrics[int(wi), s_ix[sn]]
+        cell[m_ix["invoices_total"]] += total
+        cell[m_ix["invoices_approved"]] += approved
+        cell[m_ix["invoices_unapproved"]] += total - approved
+
+    # Credit memos (5xxx GL only)
+    cm = by_type.get("AP Credit Memo", _empty)
+    for (wi, sn), v in cm.loc[gl5.loc[cm.index]] \
+            .groupby(["week_idx", "store"], sort=False)["credit"].sum().items():
+        week_metrics[int(wi), s_ix[sn], m_ix["credits"]] += v
+
+    # Waste logs: negative amount carries the value, otherwise use debit
+    waste = by_type.get("Waste Log", _empty).copy()
+    if len(waste):
+        waste["waste_amt"] = np.where(
+            waste["amount"] < 0, waste["amount"].abs(), waste["debit"])
+        for (wi, sn), v in waste.groupby(
+                ["week_idx", "store"], sort=False)["waste_amt"].sum().items():
+            week_metrics[int(wi), s_ix[sn], m_ix["waste"]] += v
+        for row in waste.itertuples(index=False):
+            item_info = item_map.get(row.itemId)
+            week_waste_items[(int(row.week_idx), row.store)].append({
+                "item": item_info["name"] if item_info is not None
+                else (row.comment if isinstance(row.comment, str) else "Unknown"),
+                "qty": abs(row.quantity),
+                "uom": row.unitOfMeasureName if isinstance(row.unitOfMeasureName, str) else "",
+                "amount": row.waste_amt,
             })
 
-        elif txn_type == "Stock Count" and row_type == "Detail":
-            if gl_num.startswith("5"):
-                wd["has_stock_count"] = True
-                wd["stock_count_date"] = txn_date_str[:10]
-                pd["has_stock_count"] = True
-                # Stock count: amount = ending inv value, previousCountTotal = beginning inv
-                prev = td.get("previousCountTotal", 0) or 0
-                adj = td.get("adjustment", 0) or 0
-                wd["inventory_end"] += amount if amount else 0
-                wd["inventory_begin"] += prev
-                wd["inventory_adjustment"] += adj
-                pd["inventory_end"] += amount if amount else 0
-                pd["inventory_begin"] += prev
-
-    # Calculate net purchases and inventory-method COGS per week/store
-    for wi in week_data:
-        for sn in week_data[wi]:
-            wd = week_data[wi][sn]
-            wd["net_purchases"] = wd["purchases_total"] - wd["credits"]
-    # Use all known stores (not just period_data keys) so stores with beginning
-    # inventory but no period transactions yet still get their BI assigned
-    all_stores = set(period_data.keys()) | set(begin_inventory.keys()) | set(STORE_NAMES.keys())
-    for sn in all_stores:
-        pd_store = period_data[sn]  # defaultdict creates entry if needed
-        pd_store["net_purchases"] = pd_store["purchases_total"] - pd_store["credits"]
-        # Period COGS = Beginning Inventory + Net Purchases - Ending Inventory
-        bi = begin_inventory.get(sn, 0)
-        ei = pd_store["inventory_end"]  # from period-end stock counts
-        np = pd_store["net_purchases"]
-        pd_store["begin_inventory"] = bi
-        if bi > 0 and ei > 0:
-            pd_store["inv_cogs"] = bi + np - ei
-        else:
-            pd_store["inv_cogs"] = 0
-
-    # Print COGS summary
-    if any(period_data[sn].get("inv_cogs", 0) != 0 for sn in period_data):
-        print(f"\n  COGS = Beginning Inv + Purchases - Ending Inv:")
-        for sn in sorted(period_data.keys()):
-            pd_store = period_data[sn]
-            bi = pd_store.get("begin_inventory", 0)
-            ei = pd_store.get("inventory_end", 0)
-            np = pd_store.get("net_purchases", 0)
-            cogs = pd_store.get("inv_cogs", 0)
-            if bi > 0 or ei > 0:
-                print(f"    {sn} {STORE_NAMES.get(sn, '')}: "
-                      f"${bi:,.0f} + ${np:,.0f} - ${ei:,.0f} = ${cogs:,.0f}")
+    # Stock counts: amount = ending inv value, previousCountTotal = beginning
+    sc_rows = by_type.get("Stock Count", _empty)
+    sc = sc_rows.loc[gl5.loc[sc_rows.index]]
+    if len(sc):
+        for (wi, sn), row in sc.groupby(["week_idx", "store"], sort=False).agg(
+                amount=("amount", "sum"), prev=("previousCountTotal", "sum"),
+                adj=("adjustment", "sum"),
+                last_date=("txn_date_str", "max")).iterrows():
+            cell = week_metrics[int(wi), s_ix[sn]]
+            cell[m_ix["has_stock_count"]] = 1
+            stock_count_dates[(int(wi), sn)] = str(row["last_date"])[:10]
+            cell[m_ix["inventory_end"]] += row["amount"]
+            cell[m_ix["inventory_begin"]] += row["prev"]
+            cell[m_ix["inventory_adjustment"]] += row["adj"]
+
+    # Net purchases per week/store in one vectorized subtraction, then the
+    # period totals are a sum over the week axis (every fill above went to
+    # exactly one week, so the axis-0 sum equals the old double bookkeeping)
+    week_metrics[:, :, m_ix["net_purchases"]] = (
+        week_metrics[:, :, m_ix["purchases_total"]]
+        - week_metrics[:, :, m_ix["credits"]])
+    period_metrics = week_metrics.sum(axis=0)
+
+    # Display rounding happens once here over the whole metric table - the
+    # summary builders below read pre-rounded cells instead of calling
+    # round() per metric per store per week. Period totals are summed from
+    # the unrounded weeks first so nothing drifts by accumulated cents.
+    week_metrics = np.round(week_metrics, 2)
+    period_metrics = np.round(period_metrics, 2)
 
     # --------------------------------------------------------
     # Step 5: Pull Toast sales for COGS % calculation
     # --------------------------------------------------------
-    print(f"\n[5/5] Pulling Toast sales for COGS % calculation...")
-    toast_token = toast_authenticate()
-    print("  Authenticated with Toast")
-    store_sales = pull_period_sales(toast_token, period_start, period_end, cache_key)
+    print(f"\n[5/5] Collecting Toast sales for COGS % calculation...")
+    store_sales = sales_future.result()
+    pool.shutdown()
 
-    # Aggregate sales by week
+    # Aggregate sales by week. Every store shares the same period days, so
+    # the date string is parsed and mapped to its week once - not once per
+    # store - and the per-store period total is a single sum().
     week_sales = defaultdict(lambda: defaultdict(float))
     period_sales = defaultdict(float)
+    wi_by_date_str = {}
     for store_num, daily_sales in store_sales.items():
         for date_str, ns in daily_sales.items():
-            dt = datetime.strptime(date_str, "%Y-%m-%d")
-            wi = date_to_week_idx(dt)
+            if date_str not in wi_by_date_str:
+                wi_by_date_str[date_str] = date_to_week_idx(
+                    datetime.strptime(date_str, "%Y-%m-%d"))
+            wi = wi_by_date_str[date_str]
             if wi is not None:
                 week_sales[wi][store_num] += ns
-            period_sales[store_num] += ns
+        period_sales[store_num] = sum(daily_sales.values())
 
     # --------------------------------------------------------
     # Load budget
@@ -779,50 +1004,57 @@ def main():
     # --------------------------------------------------------
     print("\nBuilding dashboard data...")
 
-    store_numbers = sorted(STORE_NAMES.keys())
-
     # Week summaries
     weeks_summary = []
     for wi, week in enumerate(period_weeks):
         week_stores = {}
+        # Week totals accumulate in the same pass that builds the store
+        # entries - one walk over the stores instead of eight sum() rescans.
+        all_ns = all_purchases = all_credits = all_waste = 0.0
+        all_net = all_food = all_pkg = all_bev = 0.0
         for sn in store_numbers:
-            wd = week_data[wi][sn]
+            wd = week_metrics[wi, s_ix[sn]]
             ns = week_sales[wi].get(sn, 0)
-            cogs_pct = round(wd["net_purchases"] / ns * 100, 1) if ns > 0 else 0
+            net_p = wd[m_ix["net_purchases"]]
+            cogs_pct = round(net_p / ns * 100, 1) if ns > 0 else 0
 
-            # Convert vendors dict to serializable list
-            top_vendors = sorted(wd["vendors"].items(), key=lambda x: -x[1])[:10]
+            # Convert vendors dict to serializable list - nlargest keeps a
+            # 10-element heap instead of sorting the whole vendor list
+            top_vendors = heapq.nlargest(
+                10, week_vendors.get((wi, sn), {}).items(),
+                key=operator.itemgetter(1))
 
             week_stores[sn] = {
                 "name": STORE_NAMES.get(sn, sn),
                 "net_sales": round(ns, 2),
-                "purchases_food": round(wd["purchases_food"], 2),
-                "purchases_packaging": round(wd["purchases_packaging"], 2),
-                "purchases_beverage": round(wd["purchases_beverage"], 2),
-                "purchases_other": round(wd["purchases_other"], 2),
-                "purchases_total": round(wd["purchases_total"], 2),
-                "credits": round(wd["credits"], 2),
-                "waste": round(wd["waste"], 2),
-                "net_purchases": round(wd["net_purchases"], 2),
+                "purchases_food": wd[m_ix["purchases_food"]],
+                "purchases_packaging": wd[m_ix["purchases_packaging"]],
+                "purchases_beverage": wd[m_ix["purchases_beverage"]],
+                "purchases_other": wd[m_ix["purchases_other"]],
+                "purchases_total": wd[m_ix["purchases_total"]],
+                "credits": wd[m_ix["credits"]],
+                "waste": wd[m_ix["waste"]],
+                "net_purchases": net_p,
                 "cogs_pct": cogs_pct,
-                "has_stock_count": wd["has_stock_count"],
-                "stock_count_date": wd["stock_count_date"],
-                "invoices_total": wd["invoices_total"],
-                "invoices_approved": wd["invoices_approved"],
-                "invoices_unapproved": wd["invoices_unapproved"],
+                "has_stock_count": bool(wd[m_ix["has_stock_count"]]),
+                "stock_count_date": stock_count_dates.get((wi, sn)),
+                "invoices_total": int(wd[m_ix["invoices_total"]]),
+                "invoices_approved": int(wd[m_ix["invoices_approved"]]),
+                "invoices_unapproved": int(wd[m_ix["invoices_unapproved"]]),
                 "top_vendors": [{"name": v, "amount": round(a, 2)} for v, a in top_vendors],
-                "waste_items": sorted(wd["waste_items"], key=lambda x: -x["amount"])[:10],
+                "waste_items": heapq.nlargest(
+                    10, week_waste_items.get((wi, sn), []),
+                    key=operator.itemgetter("amount")),
             }
-
-        # Week totals
-        all_ns = sum(s["net_sales"] for s in week_stores.values())
-        all_purchases = sum(s["purchases_total"] for s in week_stores.values())
-        all_credits = sum(s["credits"] for s in week_stores.values())
-        all_waste = sum(s["waste"] for s in week_stores.values())
-        all_net = sum(s["net_purchases"] for s in week_stores.values())
-        all_food = sum(s["purchases_food"] for s in week_stores.values())
-        all_pkg = sum(s["purchases_packaging"] for s in week_stores.values())
-        all_bev = sum(s["purchases_beverage"] for s in week_stores.values())
+            s = week_stores[sn]
+            all_ns += s["net_sales"]
+            all_purchases += s["purchases_total"]
+            all_credits += s["credits"]
+            all_waste += s["waste"]
+            all_net += s["net_purchases"]
+            all_food += s["purchases_food"]
+            all_pkg += s["purchases_packaging"]
+            all_bev += s["purchases_beverage"]
 
         is_current = week["start"] <= today <= week["end"] + timedelta(days=1)
         is_past = week["end"] < today
@@ -847,70 +1079,103 @@ def main():
             }
         })
 
-    # Period totals by store
+    # Period totals by store, read straight out of the summed metric table -
+    # there is no intermediate per-store dict pass anymore, and the
+    # all-stores totals accumulate in the same loop instead of eleven
+    # separate sum() rescans afterwards.
+    # Budget slices resolved once up front - the loop body does a single
+    # dict lookup per store instead of re-stringifying the period and
+    # re-walking the nested budget dict every iteration.
+    period_key = str(period)
+    budget_by_store = {
+        sn: budget.get(sn, {}).get(period_key, {}) for sn in store_numbers
+    } if budget else {}
+
     period_store_data = {}
+    all_vendor_totals = defaultdict(float)
+    all_period_ns = all_period_purchases = all_period_credits = 0.0
+    all_period_waste = all_period_net = all_period_food = 0.0
+    all_period_pkg = all_period_bev = 0.0
+    all_period_begin_inv = all_period_end_inv = all_period_inv_cogs = 0.0
     for sn in store_numbers:
-        pd = period_data[sn]
+        pm = period_metrics[s_ix[sn]]
+        net_p = pm[m_ix["net_purchases"]]
         ns = period_sales.get(sn, 0)
-        cogs_pct = round(pd["net_purchases"] / ns * 100, 1) if ns > 0 else 0
+        cogs_pct = round(net_p / ns * 100, 1) if ns > 0 else 0
 
         # Budget
-        budget_cogs_pct = 0
-        budget_cogs = 0
-        if budget and sn in budget:
-            sb = budget[sn].get(str(period), {})
-            budget_cogs_pct = sb.get("cogs_pct", 0)
-            budget_cogs = sb.get("cogs", 0)
-
-        top_vendors = sorted(pd["vendors"].items(), key=lambda x: -x[1])[:10]
-
-        bi = pd.get("begin_inventory", 0)
-        ei = pd.get("inventory_end", 0)
-        inv_cogs = pd.get("inv_cogs", 0)
+        sb = budget_by_store.get(sn, {})
+        budget_cogs_pct = sb.get("cogs_pct", 0)
+        budget_cogs = sb.get("cogs", 0)
+
+        vendors = defaultdict(float)
+        for wi in range(len(period_weeks)):
+            for vend, amt in week_vendors.get((wi, sn), {}).items():
+                vendors[vend] += amt
+        for vend, amt in vendors.items():
+            all_vendor_totals[vend] += amt
+        top_vendors = heapq.nlargest(
+            10, vendors.items(), key=operator.itemgetter(1))
+
+        # Period COGS = Beginning Inventory + Net Purchases - Ending Inventory
+        bi = begin_inventory.get(sn, 0)
+        ei = pm[m_ix["inventory_end"]]  # from period-end stock counts
+        inv_cogs = bi + net_p - ei if bi > 0 and ei > 0 else 0
         inv_cogs_pct = round(inv_cogs / ns * 100, 1) if ns > 0 and inv_cogs != 0 else 0
 
         period_store_data[sn] = {
             "name": STORE_NAMES.get(sn, sn),
             "net_sales": round(ns, 2),
-            "purchases_food": round(pd["purchases_food"], 2),
-            "purchases_packaging": round(pd["purchases_packaging"], 2),
-            "purchases_beverage": round(pd["purchases_beverage"], 2),
-            "purchases_other": round(pd.get("purchases_other", 0), 2),
-            "purchases_total": round(pd["purchases_total"], 2),
-            "credits": round(pd["credits"], 2),
-            "waste": round(pd["waste"], 2),
-            "net_purchases": round(pd["net_purchases"], 2),
+            "purchases_food": pm[m_ix["purchases_food"]],
+            "purchases_packaging": pm[m_ix["purchases_packaging"]],
+            "purchases_beverage": pm[m_ix["purchases_beverage"]],
+            "purchases_other": pm[m_ix["purchases_other"]],
+            "purchases_total": pm[m_ix["purchases_total"]],
+            "credits": pm[m_ix["credits"]],
+            "waste": pm[m_ix["waste"]],
+            "net_purchases": net_p,
             "cogs_pct": cogs_pct,
             "budget_cogs_pct": budget_cogs_pct,
             "budget_cogs": round(budget_cogs, 2),
-            "has_stock_count": pd["has_stock_count"],
+            "has_stock_count": bool(pm[m_ix["has_stock_count"]]),
             "has_begin_inv": bi > 0,
-            "invoices_total": pd["invoices_total"],
-            "invoices_approved": pd["invoices_approved"],
+            "invoices_total": int(pm[m_ix["invoices_total"]]),
+            "invoices_approved": int(pm[m_ix["invoices_approved"]]),
             "top_vendors": [{"name": v, "amount": round(a, 2)} for v, a in top_vendors],
             "begin_inventory": round(bi, 2),
-            "end_inventory": round(ei, 2),
+            "end_inventory": ei,
             "inv_cogs": round(inv_cogs, 2),
             "inv_cogs_pct": inv_cogs_pct,
         }
+        s = period_store_data[sn]
+        all_period_ns += s["net_sales"]
+        all_period_purchases += s["purchases_total"]
+        all_period_credits += s["credits"]
+        all_period_waste += s["waste"]
+        all_period_net += s["net_purchases"]
+        all_period_food += s["purchases_food"]
+        all_period_pkg += s["purchases_packaging"]
+        all_period_bev += s["purchases_beverage"]
+        all_period_begin_inv += s["begin_inventory"]
+        all_period_end_inv += s["end_inventory"]
+        all_period_inv_cogs += s["inv_cogs"]
 
-    # All stores period totals
-    all_period_ns = sum(s["net_sales"] for s in period_store_data.values())
-    all_period_purchases = sum(s["purchases_total"] for s in period_store_data.values())
-    all_period_credits = sum(s["credits"] for s in period_store_data.values())
-    all_period_waste = sum(s["waste"] for s in period_store_data.values())
-    all_period_net = sum(s["net_purchases"] for s in period_store_data.values())
-    all_period_food = sum(s["purchases_food"] for s in period_store_data.values())
-    all_period_pkg = sum(s["purchases_packaging"] for s in period_store_data.values())
-    all_period_bev = sum(s["purchases_beverage"] for s in period_store_data.values())
-    all_period_begin_inv = sum(s["begin_inventory"] for s in period_store_data.values())
-    all_period_end_inv = sum(s["end_inventory"] for s in period_store_data.values())
-    all_period_inv_cogs = sum(s["inv_cogs"] for s in period_store_data.values())
+    # Print COGS summary
+    if any(period_store_data[sn]["inv_cogs"] != 0 for sn in store_numbers):
+        print(f"\n  COGS = Beginning Inv + Purchases - Ending Inv:")
+        for sn in store_numbers:
+            s = period_store_data[sn]
+            bi = s["begin_inventory"]
+            ei = s["end_inventory"]
+            if bi > 0 or ei > 0:
+                print(f"    {sn} {STORE_NAMES.get(sn, '')}: "
+                      f"${bi:,.0f} + ${s['net_purchases']:,.0f} - ${ei:,.0f} "
+                      f"= ${s['inv_cogs']:,.0f}")
 
     # All stores budget
     all_budget_cogs_pct = 0
     if budget and "ALL" in budget:
-        all_budget_cogs_pct = budget["ALL"].get(str(period), {}).get("cogs_pct", 0)
+        all_budget_cogs_pct = budget["ALL"].get(period_key, {}).get("cogs_pct", 0)
 
     # GM sign-off status: check which stores have stock counts for current week
     gm_status = {}
@@ -923,16 +1188,18 @@ def main():
     for sn in store_numbers:
         has_begin = begin_inventory.get(sn, 0) > 0
         if current_week_idx is not None:
-            wd = week_data[current_week_idx][sn]
+            wd = week_metrics[current_week_idx, s_ix[sn]]
+            inv_total = int(wd[m_ix["invoices_total"]])
+            inv_unapproved = int(wd[m_ix["invoices_unapproved"]])
             gm_status[sn] = {
                 "name": STORE_NAMES.get(sn, sn),
-                "inventory_done": wd["has_stock_count"],
-                "stock_count_date": wd["stock_count_date"],
+                "inventory_done": bool(wd[m_ix["has_stock_count"]]),
+                "stock_count_date": stock_count_dates.get((current_week_idx, sn)),
                 "begin_inv_done": has_begin,
-                "invoices_total": wd["invoices_total"],
-                "invoices_approved": wd["invoices_approved"],
-                "invoices_unapproved": wd["invoices_unapproved"],
-                "all_approved": wd["invoices_unapproved"] == 0 and wd["invoices_total"] > 0,
+                "invoices_total": inv_total,
+                "invoices_approved": int(wd[m_ix["invoices_approved"]]),
+                "invoices_unapproved": inv_unapproved,
+                "all_approved": inv_unapproved == 0 and inv_total > 0,
             }
         else:
             gm_status[sn] = {
@@ -957,6 +1224,12 @@ def main():
         "current_week_end": current_week_end.strftime("%Y-%m-%d"),
         "weeks": weeks_summary,
         "period_stores": period_store_data,
+        # All-stores vendor ranking, already merged and top-K'd - the page
+        # renders this list as-is instead of re-aggregating and sorting
+        # per-store lists client-side
+        "all_top_vendors": [
+            {"name": v, "amount": round(a, 2)} for v, a in heapq.nlargest(
+                40, all_vendor_totals.items(), key=operator.itemgetter(1))],
         "period_totals": {
             "net_sales": round(all_period_ns, 2),
             "purchases_food": round(all_period_food, 2),
@@ -981,19 +1254,16 @@ def main():
     # --------------------------------------------------------
     # Scan for existing period dashboards to build period nav
     # --------------------------------------------------------
-    import glob as _glob
-    period_files = sorted(_glob.glob(os.path.join(OUTDIR, "cogs_P*_FY*.html")))
+    # One scandir pass with a compiled pattern - no fnmatch per entry and
+    # no string surgery to parse "cogs_P2_FY2026.html" -> period=2, fy=2026
+    period_file_re = re.compile(r"cogs_P(\d+)_FY(\d+)\.html$")
     available_periods = []
-    for pf in period_files:
-        fname = os.path.basename(pf)
-        # Parse "cogs_P2_FY2026.html" -> period=2, fy=2026
-        try:
-            parts = fname.replace("cogs_P", "").replace(".html", "").split("_FY")
-            p_num = int(parts[0])
-            fy_num = int(parts[1])
-            available_periods.append({"period": p_num, "fy": fy_num, "file": fname})
-        except:
-            continue
+    with os.scandir(OUTDIR) as entries:
+        for entry in entries:
+            m = period_file_re.match(entry.name)
+            if m:
+                available_periods.append({
+                    "period": int(m[1]), "fy": int(m[2]), "file": entry.name})
 
     # Add current period if not already in the list
     current_fname = f"cogs_P{period}_FY{fy}.html"
@@ -1004,19 +1274,34 @@ def main():
     dashboard_data["available_periods"] = available_periods
     dashboard_data["current_file"] = current_fname
 
-    # Generate HTML
-    data_json = json.dumps(dashboard_data)
+    # Generate HTML - orjson serializes the big weeks/stores structure in C
+    # and understands the numpy scalars coming out of the metric table; the
+    # stdlib fallback coerces them through default=float
+    if orjson:
+        data_json = orjson.dumps(
+            dashboard_data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    else:
+        data_json = json.dumps(dashboard_data, default=float)
     html = generate_html(data_json)
 
+    def write_atomic(outpath):
+        # Write to a temp file and rename into place so a browser refresh
+        # mid-run never sees a truncated dashboard; the big buffer keeps the
+        # ~MB page to a couple of syscalls.
+        tmp_path = outpath + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            f.write(html)
+        os.replace(tmp_path, outpath)
+
     # Save period-specific file
     period_outpath = os.path.join(OUTDIR, current_fname)
-    with open(period_outpath, "w", encoding="utf-8") as f:
-        f.write(html)
+    write_atomic(period_outpath)
 
-    # Also save as main dashboard (always points to latest run)
+    # Also save as main dashboard (always points to latest run) - copied
+    # from the period file rather than re-encoding the big string again
     main_outpath = os.path.join(OUTDIR, "cogs_dashboard.html")
-    with open(main_outpath, "w", encoding="utf-8") as f:
-        f.write(html)
+    shutil.copyfile(period_outpath, main_outpath + ".tmp")
+    os.replace(main_outpath + ".tmp", main_outpath)
 
     print(f"\n{'=' * 60}")
     print(f"  COGS Dashboard saved to:")
@@ -1027,8 +1312,11 @@ def main():
     print(f"{'=' * 60}")
 
 
-def generate_html(data_json):
-    return f'''<!DOCTYPE html>
+# The dashboard shell is static - only the JSON payload changes per run.
+# Holding it as two plain module constants means no ~24KB f-string is
+# re-parsed for brace escapes on every call; generate_html is a single
+# three-way concatenation.
+_HTML_PREFIX = '''<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
@@ -1036,98 +1324,98 @@ def generate_html(data_json):
 <title>Forage Kitchen - Weekly COGS Dashboard</title>
 <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
 <style>
-  * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-  body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #0f172a; color: #e2e8f0; min-height: 100vh; }}
+  * { margin: 0; padding: 0; box-sizing: border-box; }
+  body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #0f172a; color: #e2e8f0; min-height: 100vh; }
 
-  .header {{ background: linear-gradient(135deg, #1e293b 0%, #0f172a 100%); padding: 20px 30px; border-bottom: 1px solid #334155; display: flex; justify-content: space-between; align-items: center; }}
-  .header h1 {{ font-size: 24px; font-weight: 700; color: #f8fafc; }}
-  .header h1 span {{ color: #3b82f6; }}
-  .header .meta {{ text-align: right; font-size: 13px; color: #94a3b8; }}
-  .header .meta .period {{ font-size: 16px; color: #f8fafc; font-weight: 600; }}
-  .header .meta .source {{ font-size: 11px; color: #3b82f6; text-transform: uppercase; letter-spacing: 1px; }}
+  .header { background: linear-gradient(135deg, #1e293b 0%, #0f172a 100%); padding: 20px 30px; border-bottom: 1px solid #334155; display: flex; justify-content: space-between; align-items: center; }
+  .header h1 { font-size: 24px; font-weight: 700; color: #f8fafc; }
+  .header h1 span { color: #3b82f6; }
+  .header .meta { text-align: right; font-size: 13px; color: #94a3b8; }
+  .header .meta .period { font-size: 16px; color: #f8fafc; font-weight: 600; }
+  .header .meta .source { font-size: 11px; color: #3b82f6; text-transform: uppercase; letter-spacing: 1px; }
 
   /* Period Selector */
-  .period-nav {{ display: flex; align-items: center; gap: 8px; margin-top: 6px; justify-content: flex-end; }}
-  .period-nav label {{ font-size: 12px; color: #94a3b8; text-transform: uppercase; letter-spacing: 0.5px; }}
-  .period-select {{ background: #334155; color: #f8fafc; border: 1px solid #475569; border-radius: 6px; padding: 5px 28px 5px 10px; font-size: 13px; font-weight: 500; cursor: pointer; appearance: none; -webkit-appearance: none; -moz-appearance: none; background-image: url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='12' height='12' viewBox='0 0 12 12'%3E%3Cpath d='M3 5l3 3 3-3' stroke='%2394a3b8' stroke-width='1.5' fill='none'/%3E%3C/svg%3E"); background-repeat: no-repeat; background-position: right 8px center; }}
-  .period-select:hover {{ border-color: #3b82f6; background-color: #3d4f6e; }}
-  .period-select:focus {{ outline: none; border-color: #3b82f6; box-shadow: 0 0 0 2px rgba(59,130,246,0.3); }}
-  .period-select option {{ background: #1e293b; color: #f8fafc; }}
-  .period-badge {{ font-size: 10px; padding: 2px 6px; border-radius: 4px; font-weight: 600; letter-spacing: 0.5px; }}
-  .period-badge.closed {{ background: #22c55e22; color: #22c55e; border: 1px solid #22c55e44; }}
-  .period-badge.current {{ background: #3b82f622; color: #3b82f6; border: 1px solid #3b82f644; }}
-
-  .container {{ max-width: 1500px; margin: 0 auto; padding: 20px; }}
+  .period-nav { display: flex; align-items: center; gap: 8px; margin-top: 6px; justify-content: flex-end; }
+  .period-nav label { font-size: 12px; color: #94a3b8; text-transform: uppercase; letter-spacing: 0.5px; }
+  .period-select { background: #334155; color: #f8fafc; border: 1px solid #475569; border-radius: 6px; padding: 5px 28px 5px 10px; font-size: 13px; font-weight: 500; cursor: pointer; appearance: none; -webkit-appearance: none; -moz-appearance: none; background-image: url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='12' height='12' viewBox='0 0 12 12'%3E%3Cpath d='M3 5l3 3 3-3' stroke='%2394a3b8' stroke-width='1.5' fill='none'/%3E%3C/svg%3E"); background-repeat: no-repeat; background-position: right 8px center; }
+  .period-select:hover { border-color: #3b82f6; background-color: #3d4f6e; }
+  .period-select:focus { outline: none; border-color: #3b82f6; box-shadow: 0 0 0 2px rgba(59,130,246,0.3); }
+  .period-select option { background: #1e293b; color: #f8fafc; }
+  .period-badge { font-size: 10px; padding: 2px 6px; border-radius: 4px; font-weight: 600; letter-spacing: 0.5px; }
+  .period-badge.closed { background: #22c55e22; color: #22c55e; border: 1px solid #22c55e44; }
+  .period-badge.current { background: #3b82f622; color: #3b82f6; border: 1px solid #3b82f644; }
+
+  .container { max-width: 1500px; margin: 0 auto; padding: 20px; }
 
   /* KPI Cards */
-  .kpi-row {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 16px; margin-bottom: 24px; }}
-  .kpi-card {{ background: #1e293b; border-radius: 12px; padding: 20px; border: 1px solid #334155; }}
-  .kpi-card .label {{ font-size: 12px; text-transform: uppercase; letter-spacing: 1px; color: #94a3b8; margin-bottom: 8px; }}
-  .kpi-card .value {{ font-size: 28px; font-weight: 700; color: #f8fafc; }}
-  .kpi-card .sub {{ font-size: 13px; color: #94a3b8; margin-top: 4px; }}
-  .kpi-card .change {{ font-size: 14px; font-weight: 600; margin-top: 4px; }}
-  .positive {{ color: #22c55e; }}
-  .negative {{ color: #ef4444; }}
-  .neutral {{ color: #94a3b8; }}
-  .warning {{ color: #f59e0b; }}
+  .kpi-row { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 16px; margin-bottom: 24px; }
+  .kpi-card { background: #1e293b; border-radius: 12px; padding: 20px; border: 1px solid #334155; }
+  .kpi-card .label { font-size: 12px; text-transform: uppercase; letter-spacing: 1px; color: #94a3b8; margin-bottom: 8px; }
+  .kpi-card .value { font-size: 28px; font-weight: 700; color: #f8fafc; }
+  .kpi-card .sub { font-size: 13px; color: #94a3b8; margin-top: 4px; }
+  .kpi-card .change { font-size: 14px; font-weight: 600; margin-top: 4px; }
+  .positive { color: #22c55e; }
+  .negative { color: #ef4444; }
+  .neutral { color: #94a3b8; }
+  .warning { color: #f59e0b; }
 
   /* Section headers */
-  .section-header {{ font-size: 18px; font-weight: 600; color: #f8fafc; margin: 24px 0 12px; padding-bottom: 8px; border-bottom: 1px solid #334155; }}
+  .section-header { font-size: 18px; font-weight: 600; color: #f8fafc; margin: 24px 0 12px; padding-bottom: 8px; border-bottom: 1px solid #334155; }
 
   /* GM Status Grid */
-  .gm-grid {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(280px, 1fr)); gap: 12px; margin-bottom: 24px; }}
-  .gm-card {{ background: #1e293b; border-radius: 10px; padding: 14px 16px; border: 1px solid #334155; }}
-  .gm-card .store-name {{ font-size: 14px; font-weight: 700; color: #f8fafc; margin-bottom: 8px; }}
-  .gm-card .check-row {{ display: flex; align-items: center; gap: 8px; font-size: 13px; margin: 4px 0; }}
-  .gm-card .check-icon {{ width: 18px; height: 18px; border-radius: 50%; display: flex; align-items: center; justify-content: center; font-size: 11px; flex-shrink: 0; }}
-  .check-done {{ background: #22c55e22; color: #22c55e; border: 1px solid #22c55e44; }}
-  .check-missing {{ background: #ef444422; color: #ef4444; border: 1px solid #ef444444; }}
-  .check-partial {{ background: #f59e0b22; color: #f59e0b; border: 1px solid #f59e0b44; }}
+  .gm-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(280px, 1fr)); gap: 12px; margin-bottom: 24px; }
+  .gm-card { background: #1e293b; border-radius: 10px; padding: 14px 16px; border: 1px solid #334155; }
+  .gm-card .store-name { font-size: 14px; font-weight: 700; color: #f8fafc; margin-bottom: 8px; }
+  .gm-card .check-row { display: flex; align-items: center; gap: 8px; font-size: 13px; margin: 4px 0; }
+  .gm-card .check-icon { width: 18px; height: 18px; border-radius: 50%; display: flex; align-items: center; justify-content: center; font-size: 11px; flex-shrink: 0; }
+  .check-done { background: #22c55e22; color: #22c55e; border: 1px solid #22c55e44; }
+  .check-missing { background: #ef444422; color: #ef4444; border: 1px solid #ef444444; }
+  .check-partial { background: #f59e0b22; color: #f59e0b; border: 1px solid #f59e0b44; }
 
   /* Charts row */
-  .charts-row {{ display: grid; grid-template-columns: 1fr 1fr; gap: 16px; margin-bottom: 24px; }}
-  .chart-card {{ background: #1e293b; border-radius: 12px; padding: 20px; border: 1px solid #334155; }}
-  .chart-card h3 {{ font-size: 14px; color: #94a3b8; margin-bottom: 12px; text-transform: uppercase; letter-spacing: 0.5px; }}
+  .charts-row { display: grid; grid-template-columns: 1fr 1fr; gap: 16px; margin-bottom: 24px; }
+  .chart-card { background: #1e293b; border-radius: 12px; padding: 20px; border: 1px solid #334155; }
+  .chart-card h3 { font-size: 14px; color: #94a3b8; margin-bottom: 12px; text-transform: uppercase; letter-spacing: 0.5px; }
 
   /* Tables */
-  .store-table {{ width: 100%; border-collapse: collapse; background: #1e293b; border-radius: 12px; overflow: hidden; border: 1px solid #334155; }}
-  .store-table th {{ background: #334155; padding: 12px 16px; text-align: left; font-size: 12px; text-transform: uppercase; letter-spacing: 1px; color: #94a3b8; font-weight: 600; }}
-  .store-table th.right, .store-table td.right {{ text-align: right; }}
-  .store-table td {{ padding: 12px 16px; border-bottom: 1px solid #1e293b; font-size: 14px; }}
-  .store-table tr:nth-child(even) {{ background: #1e293b; }}
-  .store-table tr:nth-child(odd) {{ background: #172033; }}
-  .store-table tr:hover {{ background: #253352; }}
-  .store-table tr.total-row {{ background: #334155 !important; font-weight: 700; }}
-  .store-table tr.total-row td {{ border-top: 2px solid #4a5568; }}
+  .store-table { width: 100%; border-collapse: collapse; background: #1e293b; border-radius: 12px; overflow: hidden; border: 1px solid #334155; }
+  .store-table th { background: #334155; padding: 12px 16px; text-align: left; font-size: 12px; text-transform: uppercase; letter-spacing: 1px; color: #94a3b8; font-weight: 600; }
+  .store-table th.right, .store-table td.right { text-align: right; }
+  .store-table td { padding: 12px 16px; border-bottom: 1px solid #1e293b; font-size: 14px; }
+  .store-table tr:nth-child(even) { background: #1e293b; }
+  .store-table tr:nth-child(odd) { background: #172033; }
+  .store-table tr:hover { background: #253352; }
+  .store-table tr.total-row { background: #334155 !important; font-weight: 700; }
+  .store-table tr.total-row td { border-top: 2px solid #4a5568; }
 
   /* Week tabs */
-  .tab-bar {{ display: flex; gap: 4px; margin-bottom: 16px; flex-wrap: wrap; }}
-  .tab-btn {{ padding: 8px 16px; background: #1e293b; border: 1px solid #334155; border-radius: 8px; color: #94a3b8; cursor: pointer; font-size: 13px; font-weight: 500; transition: all 0.2s; }}
-  .tab-btn:hover {{ background: #253352; color: #f8fafc; }}
-  .tab-btn.active {{ background: #3b82f6; color: #fff; border-color: #3b82f6; font-weight: 700; }}
-  .tab-btn .current {{ font-size: 10px; display: block; color: #93c5fd; }}
-  .tab-content {{ display: none; }}
-  .tab-content.active {{ display: block; }}
+  .tab-bar { display: flex; gap: 4px; margin-bottom: 16px; flex-wrap: wrap; }
+  .tab-btn { padding: 8px 16px; background: #1e293b; border: 1px solid #334155; border-radius: 8px; color: #94a3b8; cursor: pointer; font-size: 13px; font-weight: 500; transition: all 0.2s; }
+  .tab-btn:hover { background: #253352; color: #f8fafc; }
+  .tab-btn.active { background: #3b82f6; color: #fff; border-color: #3b82f6; font-weight: 700; }
+  .tab-btn .current { font-size: 10px; display: block; color: #93c5fd; }
+  .tab-content { display: none; }
+  .tab-content.active { display: block; }
 
   /* Vendor table */
-  .vendor-grid {{ display: grid; grid-template-columns: 1fr 1fr; gap: 16px; margin-top: 16px; }}
-  .vendor-card {{ background: #1e293b; border-radius: 12px; padding: 16px; border: 1px solid #334155; }}
-  .vendor-card h3 {{ font-size: 14px; color: #94a3b8; margin-bottom: 10px; text-transform: uppercase; letter-spacing: 0.5px; }}
-  .vendor-list {{ list-style: none; }}
-  .vendor-list li {{ display: flex; justify-content: space-between; padding: 6px 0; border-bottom: 1px solid #253352; font-size: 13px; }}
-  .vendor-list li .v-name {{ color: #e2e8f0; }}
-  .vendor-list li .v-amt {{ color: #94a3b8; font-weight: 500; }}
-
-  .refresh-notice {{ text-align: center; padding: 12px; color: #64748b; font-size: 12px; margin-top: 20px; }}
-  .refresh-notice code {{ background: #334155; padding: 2px 8px; border-radius: 4px; color: #94a3b8; }}
-
-  @media (max-width: 768px) {{
-    .charts-row {{ grid-template-columns: 1fr; }}
-    .kpi-row {{ grid-template-columns: repeat(2, 1fr); }}
-    .vendor-grid {{ grid-template-columns: 1fr; }}
-    .header {{ flex-direction: column; gap: 10px; }}
-    .header .meta {{ text-align: left; }}
-  }}
+  .vendor-grid { display: grid; grid-template-columns: 1fr 1fr; gap: 16px; margin-top: 16px; }
+  .vendor-card { background: #1e293b; border-radius: 12px; padding: 16px; border: 1px solid #334155; }
+  .vendor-card h3 { font-size: 14px; color: #94a3b8; margin-bottom: 10px; text-transform: uppercase; letter-spacing: 0.5px; }
+  .vendor-list { list-style: none; }
+  .vendor-list li { display: flex; justify-content: space-between; padding: 6px 0; border-bottom: 1px solid #253352; font-size: 13px; }
+  .vendor-list li .v-name { color: #e2e8f0; }
+  .vendor-list li .v-amt { color: #94a3b8; font-weight: 500; }
+
+  .refresh-notice { text-align: center; padding: 12px; color: #64748b; font-size: 12px; margin-top: 20px; }
+  .refresh-notice code { background: #334155; padding: 2px 8px; border-radius: 4px; color: #94a3b8; }
+
+  @media (max-width: 768px) {
+    .charts-row { grid-template-columns: 1fr; }
+    .kpi-row { grid-template-columns: repeat(2, 1fr); }
+    .vendor-grid { grid-template-columns: 1fr; }
+    .header { flex-direction: column; gap: 10px; }
+    .header .meta { text-align: left; }
+  }
 </style>
 </head>
 <body>
@@ -1189,26 +1477,28 @@ def generate_html(data_json):
 </div>
 
 <script>
-const D = {data_json};
+const D = '''
+
+_HTML_SUFFIX = ''';
 
-const fmt = (n) => n == null ? '\\u2014' : '$' + Number(n).toLocaleString('en-US', {{minimumFractionDigits:0, maximumFractionDigits:0}});
+const fmt = (n) => n == null ? '\\u2014' : '$' + Number(n).toLocaleString('en-US', {minimumFractionDigits:0, maximumFractionDigits:0});
 const fmtPct = (n) => n == null ? '\\u2014' : n.toFixed(1) + '%';
-const fmtChange = (n) => {{
+const fmtChange = (n) => {
   if (n == null) return '<span class="neutral">N/A</span>';
   const cls = n >= 0 ? 'positive' : 'negative';
   const sign = n >= 0 ? '+' : '';
-  return `<span class="${{cls}}">${{sign}}${{n.toFixed(1)}}%</span>`;
-}};
+  return `<span class="${cls}">${sign}${n.toFixed(1)}%</span>`;
+};
 const dayNames = ['Sun','Mon','Tue','Wed','Thu','Fri','Sat'];
-const shortDate = (s) => {{
+const shortDate = (s) => {
   const d = new Date(s + 'T12:00:00');
   return (d.getMonth()+1) + '/' + d.getDate();
-}};
+};
 
 // Header
-document.getElementById('periodLabel').textContent = `FY${{D.fiscal_year}} Period ${{D.period}}`;
-document.getElementById('dateRange').textContent = `${{D.period_start}} to ${{D.period_end}}`;
-document.getElementById('lastUpdated').textContent = `Updated: ${{new Date(D.generated).toLocaleString()}}`;
+document.getElementById('periodLabel').textContent = `FY${D.fiscal_year} Period ${D.period}`;
+document.getElementById('dateRange').textContent = `${D.period_start} to ${D.period_end}`;
+document.getElementById('lastUpdated').textContent = `Updated: ${new Date(D.generated).toLocaleString()}`;
 document.getElementById('refreshTime').textContent = new Date(D.generated).toLocaleString();
 
 // Period Selector
@@ -1223,19 +1513,19 @@ const isClosed = periodEndDate < new Date();
 periodBadge.textContent = isClosed ? 'CLOSED' : 'LIVE';
 periodBadge.className = 'period-badge ' + (isClosed ? 'closed' : 'current');
 
-availablePeriods.forEach(ap => {{
+availablePeriods.forEach(ap => {
   const opt = document.createElement('option');
   opt.value = ap.file;
-  opt.textContent = `P${{ap.period}} FY${{ap.fy}}`;
+  opt.textContent = `P${ap.period} FY${ap.fy}`;
   if (ap.file === currentFile) opt.selected = true;
   periodSelect.appendChild(opt);
-}});
+});
 
-function switchPeriod(file) {{
-  if (file && file !== currentFile) {{
+function switchPeriod(file) {
+  if (file && file !== currentFile) {
     window.location.href = file;
-  }}
-}}
+  }
+}
 
 // KPI Cards - Inventory method COGS
 const pt = D.period_totals;
@@ -1243,35 +1533,35 @@ const hasInvCogs = pt.inv_cogs !== 0 && pt.begin_inventory > 0;
 const invCogsPct = hasInvCogs ? pt.inv_cogs_pct : pt.cogs_pct;
 const budgetVar = pt.budget_cogs_pct > 0 ? invCogsPct - pt.budget_cogs_pct : null;
 const kpis = [
-  {{ label: 'COGS $', value: hasInvCogs ? fmt(pt.inv_cogs) : fmt(pt.net_purchases), sub: hasInvCogs ? 'Begin Inv + Purchases - End Inv' : 'R365 Purchases (no inv counts yet)', change: null }},
-  {{ label: 'COGS %', value: fmtPct(invCogsPct), sub: 'Budget: ' + fmtPct(pt.budget_cogs_pct), highlight: budgetVar != null ? -budgetVar : null, change: budgetVar != null ? -budgetVar : null, changeLabel: 'vs Budget' }},
-  {{ label: 'Net Sales', value: fmt(pt.net_sales), sub: 'Toast POS', change: null }},
-  {{ label: 'Begin Inventory', value: fmt(pt.begin_inventory), sub: 'Prior period-end count', change: null }},
-  {{ label: 'End Inventory', value: fmt(pt.end_inventory), sub: 'Current period-end count', change: null }},
-  {{ label: 'R365 Purchases', value: fmt(pt.net_purchases), sub: 'Invoices - Credits (R365 OData)', change: null }},
+  { label: 'COGS $', value: hasInvCogs ? fmt(pt.inv_cogs) : fmt(pt.net_purchases), sub: hasInvCogs ? 'Begin Inv + Purchases - End Inv' : 'R365 Purchases (no inv counts yet)', change: null },
+  { label: 'COGS %', value: fmtPct(invCogsPct), sub: 'Budget: ' + fmtPct(pt.budget_cogs_pct), highlight: budgetVar != null ? -budgetVar : null, change: budgetVar != null ? -budgetVar : null, changeLabel: 'vs Budget' },
+  { label: 'Net Sales', value: fmt(pt.net_sales), sub: 'Toast POS', change: null },
+  { label: 'Begin Inventory', value: fmt(pt.begin_inventory), sub: 'Prior period-end count', change: null },
+  { label: 'End Inventory', value: fmt(pt.end_inventory), sub: 'Current period-end count', change: null },
+  { label: 'R365 Purchases', value: fmt(pt.net_purchases), sub: 'Invoices - Credits (R365 OData)', change: null },
 ];
 
 const kpiRow = document.getElementById('kpiRow');
-kpis.forEach(k => {{
+kpis.forEach(k => {
   const card = document.createElement('div');
   card.className = 'kpi-card';
   let changeHtml = '';
-  if (k.change != null) {{
+  if (k.change != null) {
     const cls = k.change >= 0 ? 'positive' : 'negative';
     const sign = k.change >= 0 ? '+' : '';
-    changeHtml = `<div class="change ${{cls}}">${{sign}}${{k.change.toFixed(1)}}% ${{k.changeLabel || ''}}</div>`;
-  }}
+    changeHtml = `<div class="change ${cls}">${sign}${k.change.toFixed(1)}% ${k.changeLabel || ''}</div>`;
+  }
   let valueColor = '';
-  if (k.highlight != null) {{
+  if (k.highlight != null) {
     valueColor = k.highlight >= 0 ? 'color:#22c55e' : 'color:#ef4444';
-  }}
-  card.innerHTML = `<div class="label">${{k.label}}</div><div class="value" style="${{valueColor}}">${{k.value}}</div><div class="sub">${{k.sub}}</div>${{changeHtml}}`;
+  }
+  card.innerHTML = `<div class="label">${k.label}</div><div class="value" style="${valueColor}">${k.value}</div><div class="sub">${k.sub}</div>${changeHtml}`;
   kpiRow.appendChild(card);
-}});
+});
 
 // GM Sign-Off Status
 const gmGrid = document.getElementById('gmGrid');
-D.store_order.forEach(sn => {{
+D.store_order.forEach(sn => {
   const gm = D.gm_status[sn];
   if (!gm) return;
   const card = document.createElement('div');
@@ -1280,7 +1570,7 @@ D.store_order.forEach(sn => {{
   const invIcon = gm.all_approved ? 'check-done' : (gm.invoices_approved > 0 ? 'check-partial' : 'check-missing');
   const invSymbol = gm.all_approved ? '\\u2713' : (gm.invoices_approved > 0 ? '!' : '\\u2717');
   const invText = gm.invoices_total > 0
-    ? `${{gm.invoices_approved}}/${{gm.invoices_total}} approved` + (gm.invoices_unapproved > 0 ? ` (${{gm.invoices_unapproved}} pending)` : '')
+    ? `${gm.invoices_approved}/${gm.invoices_total} approved` + (gm.invoices_unapproved > 0 ? ` (${gm.invoices_unapproved} pending)` : '')
     : 'No invoices this week';
 
   const beginIcon = gm.begin_inv_done ? 'check-done' : 'check-missing';
@@ -1290,26 +1580,26 @@ D.store_order.forEach(sn => {{
   const countIcon = gm.inventory_done ? 'check-done' : 'check-missing';
   const countSymbol = gm.inventory_done ? '\\u2713' : '\\u2717';
   const countText = gm.inventory_done
-    ? `Completed ${{gm.stock_count_date || ''}}`
+    ? `Completed ${gm.stock_count_date || ''}`
     : 'Not yet completed';
 
   card.innerHTML = `
-    <div class="store-name">${{sn}} ${{gm.name}}</div>
+    <div class="store-name">${sn} ${gm.name}</div>
     <div class="check-row">
-      <div class="check-icon ${{beginIcon}}">${{beginSymbol}}</div>
-      <div>Beginning Inv Count: ${{beginText}}</div>
+      <div class="check-icon ${beginIcon}">${beginSymbol}</div>
+      <div>Beginning Inv Count: ${beginText}</div>
     </div>
     <div class="check-row">
-      <div class="check-icon ${{countIcon}}">${{countSymbol}}</div>
-      <div>Ending Inv Count: ${{countText}}</div>
+      <div class="check-icon ${countIcon}">${countSymbol}</div>
+      <div>Ending Inv Count: ${countText}</div>
     </div>
     <div class="check-row">
-      <div class="check-icon ${{invIcon}}">${{invSymbol}}</div>
-      <div>Invoices: ${{invText}}</div>
+      <div class="check-icon ${invIcon}">${invSymbol}</div>
+      <div>Invoices: ${invText}</div>
     </div>
   `;
   gmGrid.appendChild(card);
-}});
+});
 
 // COGS % by Week Chart
 const weekLabels = D.weeks.map(w => 'Wk' + w.week_num + ' (' + shortDate(w.start) + ')');
@@ -1317,48 +1607,48 @@ const weekR365CogsPct = D.weeks.map(w => w.totals.cogs_pct);
 const budgetLine = D.period_totals.budget_cogs_pct > 0 ? D.weeks.map(() => D.period_totals.budget_cogs_pct) : [];
 
 const cogsPctDatasets = [
-  {{ label: 'Weekly Purchases %', data: weekR365CogsPct, backgroundColor: '#3b82f688', borderColor: '#3b82f6', borderWidth: 2, type: 'bar' }},
+  { label: 'Weekly Purchases %', data: weekR365CogsPct, backgroundColor: '#3b82f688', borderColor: '#3b82f6', borderWidth: 2, type: 'bar' },
 ];
-if (budgetLine.length > 0) {{
-  cogsPctDatasets.push({{ label: 'Budget COGS %', data: budgetLine, borderColor: '#ef444488', borderDash: [6,4], borderWidth: 2, pointRadius: 0, fill: false, type: 'line' }});
-}}
+if (budgetLine.length > 0) {
+  cogsPctDatasets.push({ label: 'Budget COGS %', data: budgetLine, borderColor: '#ef444488', borderDash: [6,4], borderWidth: 2, pointRadius: 0, fill: false, type: 'line' });
+}
 
-new Chart(document.getElementById('cogsPctChart'), {{
+new Chart(document.getElementById('cogsPctChart'), {
   type: 'bar',
-  data: {{ labels: weekLabels, datasets: cogsPctDatasets }},
-  options: {{
+  data: { labels: weekLabels, datasets: cogsPctDatasets },
+  options: {
     responsive: true,
-    plugins: {{ legend: {{ labels: {{ color: '#94a3b8' }} }} }},
-    scales: {{
-      x: {{ ticks: {{ color: '#64748b', font: {{ size: 10 }} }}, grid: {{ color: '#1e293b' }} }},
-      y: {{ ticks: {{ color: '#64748b', callback: v => v + '%' }}, grid: {{ color: '#1e293b44' }}, suggestedMin: 20, suggestedMax: 40 }}
-    }}
-  }}
-}});
+    plugins: { legend: { labels: { color: '#94a3b8' } } },
+    scales: {
+      x: { ticks: { color: '#64748b', font: { size: 10 } }, grid: { color: '#1e293b' } },
+      y: { ticks: { color: '#64748b', callback: v => v + '%' }, grid: { color: '#1e293b44' }, suggestedMin: 20, suggestedMax: 40 }
+    }
+  }
+});
 
 // COGS Breakdown Donut - R365 invoice categories (what we can see)
-new Chart(document.getElementById('cogsBreakdownChart'), {{
+new Chart(document.getElementById('cogsBreakdownChart'), {
   type: 'doughnut',
-  data: {{
+  data: {
     labels: ['Food', 'Packaging', 'Beverage', 'Waste'],
-    datasets: [{{
+    datasets: [{
       data: [pt.purchases_food, pt.purchases_packaging, pt.purchases_beverage, pt.waste],
       backgroundColor: ['#3b82f6', '#8b5cf6', '#22c55e', '#ef4444'],
       borderColor: '#0f172a',
       borderWidth: 2,
-    }}]
-  }},
-  options: {{
+    }]
+  },
+  options: {
     responsive: true,
-    plugins: {{
-      legend: {{ position: 'bottom', labels: {{ color: '#94a3b8', padding: 16 }} }},
-    }}
-  }}
-}});
+    plugins: {
+      legend: { position: 'bottom', labels: { color: '#94a3b8', padding: 16 } },
+    }
+  }
+});
 
 // Store Scoreboard Table - Inventory method COGS
 const storeTable = document.getElementById('storeTable');
-let tableHtml = `<thead><tr>
+const tableParts = [`<thead><tr>
   <th>Store</th>
   <th class="right">Net Sales</th>
   <th class="right">Begin Inv</th>
@@ -1369,9 +1659,9 @@ let tableHtml = `<thead><tr>
   <th class="right">Budget %</th>
   <th class="right">Variance</th>
   <th class="right">Waste</th>
-</tr></thead><tbody>`;
+</tr></thead><tbody>`];
 
-D.store_order.forEach(sn => {{
+D.store_order.forEach(sn => {
   const s = D.period_stores[sn];
   if (!s) return;
   // Use inv_cogs if available, otherwise fall back to net_purchases
@@ -1380,55 +1670,55 @@ D.store_order.forEach(sn => {{
   const cogsPct = hasCogs ? s.inv_cogs_pct : s.cogs_pct;
   const bVar = s.budget_cogs_pct > 0 ? cogsPct - s.budget_cogs_pct : null;
   const varHtml = bVar != null
-    ? `<span class="${{bVar <= 0 ? 'positive' : 'negative'}}">${{bVar > 0 ? '+' : ''}}${{bVar.toFixed(1)}}%</span>`
+    ? `<span class="${bVar <= 0 ? 'positive' : 'negative'}">${bVar > 0 ? '+' : ''}${bVar.toFixed(1)}%</span>`
     : '<span class="neutral">\\u2014</span>';
   const cogsCls = cogsPct > 35 ? 'negative' : cogsPct > 32 ? 'warning' : 'positive';
   const biHtml = s.has_begin_inv ? fmt(s.begin_inventory) : '<span class="neutral">\\u2014</span>';
   const eiHtml = s.has_stock_count ? fmt(s.end_inventory) : '<span class="neutral">\\u2014</span>';
 
-  tableHtml += `<tr>
-    <td><strong>${{sn}}</strong> ${{s.name}}</td>
-    <td class="right">${{fmt(s.net_sales)}}</td>
-    <td class="right" style="color:#94a3b8">${{biHtml}}</td>
-    <td class="right">${{fmt(s.net_purchases)}}</td>
-    <td class="right" style="color:#94a3b8">${{eiHtml}}</td>
-    <td class="right">${{fmt(cogsVal)}}</td>
-    <td class="right"><span class="${{cogsCls}}">${{fmtPct(cogsPct)}}</span></td>
-    <td class="right" style="color:#94a3b8">${{fmtPct(s.budget_cogs_pct)}}</td>
-    <td class="right">${{varHtml}}</td>
-    <td class="right" style="color:#f59e0b">${{fmt(s.waste)}}</td>
-  </tr>`;
-}});
+  tableParts.push(`<tr>
+    <td><strong>${sn}</strong> ${s.name}</td>
+    <td class="right">${fmt(s.net_sales)}</td>
+    <td class="right" style="color:#94a3b8">${biHtml}</td>
+    <td class="right">${fmt(s.net_purchases)}</td>
+    <td class="right" style="color:#94a3b8">${eiHtml}</td>
+    <td class="right">${fmt(cogsVal)}</td>
+    <td class="right"><span class="${cogsCls}">${fmtPct(cogsPct)}</span></td>
+    <td class="right" style="color:#94a3b8">${fmtPct(s.budget_cogs_pct)}</td>
+    <td class="right">${varHtml}</td>
+    <td class="right" style="color:#f59e0b">${fmt(s.waste)}</td>
+  </tr>`);
+});
 
 // Total row
 const totalCogsPct = hasInvCogs ? pt.inv_cogs_pct : pt.cogs_pct;
 const totalBudgetVar = pt.budget_cogs_pct > 0 ? totalCogsPct - pt.budget_cogs_pct : null;
 const totalVarHtml = totalBudgetVar != null
-  ? `<span class="${{totalBudgetVar <= 0 ? 'positive' : 'negative'}}">${{totalBudgetVar > 0 ? '+' : ''}}${{totalBudgetVar.toFixed(1)}}%</span>`
+  ? `<span class="${totalBudgetVar <= 0 ? 'positive' : 'negative'}">${totalBudgetVar > 0 ? '+' : ''}${totalBudgetVar.toFixed(1)}%</span>`
   : '<span class="neutral">\\u2014</span>';
-tableHtml += `<tr class="total-row">
+tableParts.push(`<tr class="total-row">
   <td><strong>ALL STORES</strong></td>
-  <td class="right">${{fmt(pt.net_sales)}}</td>
-  <td class="right" style="color:#94a3b8">${{fmt(pt.begin_inventory)}}</td>
-  <td class="right">${{fmt(pt.net_purchases)}}</td>
-  <td class="right" style="color:#94a3b8">${{fmt(pt.end_inventory)}}</td>
-  <td class="right">${{hasInvCogs ? fmt(pt.inv_cogs) : fmt(pt.net_purchases)}}</td>
-  <td class="right">${{fmtPct(totalCogsPct)}}</td>
-  <td class="right" style="color:#94a3b8">${{fmtPct(pt.budget_cogs_pct)}}</td>
-  <td class="right">${{totalVarHtml}}</td>
-  <td class="right" style="color:#f59e0b">${{fmt(pt.waste)}}</td>
-</tr>`;
-tableHtml += '</tbody>';
-storeTable.innerHTML = tableHtml;
+  <td class="right">${fmt(pt.net_sales)}</td>
+  <td class="right" style="color:#94a3b8">${fmt(pt.begin_inventory)}</td>
+  <td class="right">${fmt(pt.net_purchases)}</td>
+  <td class="right" style="color:#94a3b8">${fmt(pt.end_inventory)}</td>
+  <td class="right">${hasInvCogs ? fmt(pt.inv_cogs) : fmt(pt.net_purchases)}</td>
+  <td class="right">${fmtPct(totalCogsPct)}</td>
+  <td class="right" style="color:#94a3b8">${fmtPct(pt.budget_cogs_pct)}</td>
+  <td class="right">${totalVarHtml}</td>
+  <td class="right" style="color:#f59e0b">${fmt(pt.waste)}</td>
+</tr></tbody>`);
+// one join + one innerHTML parse instead of growing a string per row
+storeTable.innerHTML = tableParts.join('');
 
 // Weekly Detail Tabs
 const weekTabBar = document.getElementById('weekTabBar');
 const weekTabContents = document.getElementById('weekTabContents');
 
-D.weeks.forEach((w, i) => {{
+D.weeks.forEach((w, i) => {
   const btn = document.createElement('div');
   btn.className = 'tab-btn' + (w.is_current ? ' active' : '');
-  btn.innerHTML = `Wk${{w.week_num}} (${{shortDate(w.start)}}-${{shortDate(w.end)}})${{w.is_current ? '<span class="current">Current</span>' : ''}}`;
+  btn.innerHTML = `Wk${w.week_num} (${shortDate(w.start)}-${shortDate(w.end)})${w.is_current ? '<span class="current">Current</span>' : ''}`;
   btn.onclick = (e) => switchWeekTab(i, e.target.closest('.tab-btn'));
   weekTabBar.appendChild(btn);
 
@@ -1437,10 +1727,10 @@ D.weeks.forEach((w, i) => {{
   div.id = 'week-tab-' + i;
   div.innerHTML = buildWeekTable(w);
   weekTabContents.appendChild(div);
-}});
+});
 
-function buildWeekTable(w) {{
-  let html = `<table class="store-table"><thead><tr>
+function buildWeekTable(w) {
+  const parts = [`<table class="store-table"><thead><tr>
     <th>Store</th>
     <th class="right">Net Sales</th>
     <th class="right">Food</th>
@@ -1452,86 +1742,81 @@ function buildWeekTable(w) {{
     <th class="right">COGS %</th>
     <th class="right">Waste</th>
     <th class="right">Inv Count</th>
-  </tr></thead><tbody>`;
+  </tr></thead><tbody>`];
 
-  D.store_order.forEach(sn => {{
+  D.store_order.forEach(sn => {
     const s = w.stores[sn];
     if (!s) return;
     const cogsCls = s.cogs_pct > 35 ? 'negative' : s.cogs_pct > 32 ? 'warning' : 'positive';
     const countHtml = s.has_stock_count
-      ? `<span class="positive">\\u2713 ${{s.stock_count_date ? s.stock_count_date.slice(5) : ''}}</span>`
+      ? `<span class="positive">\\u2713 ${s.stock_count_date ? s.stock_count_date.slice(5) : ''}</span>`
       : '<span class="negative">\\u2717</span>';
 
-    html += `<tr>
-      <td><strong>${{sn}}</strong> ${{s.name}}</td>
-      <td class="right">${{fmt(s.net_sales)}}</td>
-      <td class="right">${{fmt(s.purchases_food)}}</td>
-      <td class="right">${{fmt(s.purchases_packaging)}}</td>
-      <td class="right">${{fmt(s.purchases_beverage)}}</td>
-      <td class="right">${{fmt(s.purchases_total)}}</td>
-      <td class="right" style="color:#94a3b8">${{fmt(s.credits)}}</td>
-      <td class="right">${{fmt(s.net_purchases)}}</td>
-      <td class="right"><span class="${{cogsCls}}">${{fmtPct(s.cogs_pct)}}</span></td>
-      <td class="right" style="color:#f59e0b">${{fmt(s.waste)}}</td>
-      <td class="right">${{countHtml}}</td>
-    </tr>`;
-  }});
+    parts.push(`<tr>
+      <td><strong>${sn}</strong> ${s.name}</td>
+      <td class="right">${fmt(s.net_sales)}</td>
+      <td class="right">${fmt(s.purchases_food)}</td>
+      <td class="right">${fmt(s.purchases_packaging)}</td>
+      <td class="right">${fmt(s.purchases_beverage)}</td>
+      <td class="right">${fmt(s.purchases_total)}</td>
+      <td class="right" style="color:#94a3b8">${fmt(s.credits)}</td>
+      <td class="right">${fmt(s.net_purchases)}</td>
+      <td class="right"><span class="${cogsCls}">${fmtPct(s.cogs_pct)}</span></td>
+      <td class="right" style="color:#f59e0b">${fmt(s.waste)}</td>
+      <td class="right">${countHtml}</td>
+    </tr>`);
+  });
 
   // Week total row
   const t = w.totals;
-  html += `<tr class="total-row">
+  parts.push(`<tr class="total-row">
     <td><strong>TOTAL</strong></td>
-    <td class="right">${{fmt(t.net_sales)}}</td>
-    <td class="right">${{fmt(t.purchases_food)}}</td>
-    <td class="right">${{fmt(t.purchases_packaging)}}</td>
-    <td class="right">${{fmt(t.purchases_beverage)}}</td>
-    <td class="right">${{fmt(t.purchases_total)}}</td>
-    <td class="right" style="color:#94a3b8">${{fmt(t.credits)}}</td>
-    <td class="right">${{fmt(t.net_purchases)}}</td>
-    <td class="right">${{fmtPct(t.cogs_pct)}}</td>
-    <td class="right" style="color:#f59e0b">${{fmt(t.waste)}}</td>
+    <td class="right">${fmt(t.net_sales)}</td>
+    <td class="right">${fmt(t.purchases_food)}</td>
+    <td class="right">${fmt(t.purchases_packaging)}</td>
+    <td class="right">${fmt(t.purchases_beverage)}</td>
+    <td class="right">${fmt(t.purchases_total)}</td>
+    <td class="right" style="color:#94a3b8">${fmt(t.credits)}</td>
+    <td class="right">${fmt(t.net_purchases)}</td>
+    <td class="right">${fmtPct(t.cogs_pct)}</td>
+    <td class="right" style="color:#f59e0b">${fmt(t.waste)}</td>
     <td class="right">\\u2014</td>
-  </tr>`;
-
-  html += '</tbody></table>';
-  return html;
-}}
+  </tr></tbody></table>`);
+  return parts.join('');
+}
 
-function switchWeekTab(idx, btn) {{
+function switchWeekTab(idx, btn) {
   document.querySelectorAll('#weekTabBar .tab-btn').forEach(b => b.classList.remove('active'));
   document.querySelectorAll('#weekTabContents .tab-content').forEach(c => c.classList.remove('active'));
   btn.classList.add('active');
   document.getElementById('week-tab-' + idx).classList.add('active');
-}}
+}
 
-// Top Vendors (period totals, split into two columns)
+// Top Vendors (period totals, split into two columns) - pre-aggregated
+// and pre-sorted server-side
 const vendorGrid = document.getElementById('vendorGrid');
-const allVendors = {{}};
-D.store_order.forEach(sn => {{
-  const s = D.period_stores[sn];
-  if (!s) return;
-  s.top_vendors.forEach(v => {{
-    allVendors[v.name] = (allVendors[v.name] || 0) + v.amount;
-  }});
-}});
-const sortedVendors = Object.entries(allVendors).sort((a,b) => b[1] - a[1]);
+const sortedVendors = D.all_top_vendors.map(v => [v.name, v.amount]);
 const half = Math.ceil(sortedVendors.length / 2);
-[sortedVendors.slice(0, half), sortedVendors.slice(half)].forEach((chunk, ci) => {{
+[sortedVendors.slice(0, half), sortedVendors.slice(half)].forEach((chunk, ci) => {
   if (chunk.length === 0) return;
   const card = document.createElement('div');
   card.className = 'vendor-card';
-  let html = `<h3>${{ci === 0 ? 'Top Vendors' : 'More Vendors'}}</h3><ul class="vendor-list">`;
-  chunk.forEach(([name, amt]) => {{
-    html += `<li><span class="v-name">${{name}}</span><span class="v-amt">${{fmt(amt)}}</span></li>`;
-  }});
-  html += '</ul>';
-  card.innerHTML = html;
+  const parts = [`<h3>${ci === 0 ? 'Top Vendors' : 'More Vendors'}</h3><ul class="vendor-list">`];
+  chunk.forEach(([name, amt]) => {
+    parts.push(`<li><span class="v-name">${name}</span><span class="v-amt">${fmt(amt)}</span></li>`);
+  });
+  parts.push('</ul>');
+  card.innerHTML = parts.join('');
   vendorGrid.appendChild(card);
-}});
+});
 </script>
 </body>
 </html>'''
 
 
+def generate_html(data_json):
+    return _HTML_PREFIX + data_json + _HTML_SUFFIX
+
+
 if __name__ == "__main__":
     main()